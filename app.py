@@ -1,6 +1,5 @@
 import streamlit as st
 import requests
-import time
 from datetime import datetime
 
 # Page Configuration
@@ -393,6 +392,98 @@ st.markdown("""
 
 # API Configuration - Use the correct field names
 API_URL = "http://127.0.0.1:8000/predict"
+HEALTH_URL = "http://127.0.0.1:8000/health"
+SUGGEST_URL = "http://127.0.0.1:8000/suggest"
+STATS_URL = "http://127.0.0.1:8000/stats"
+
+@st.cache_resource
+def api_session():
+    # One keep-alive connection pool for every rerun and every browser session
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class _UncachedResponse(Exception):
+    # Raised out of the cached function so error responses aren't memoized
+    pass
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_json(url, params=None):
+    try:
+        response = api_session().get(url, params=params, timeout=2)
+    except requests.exceptions.RequestException as e:
+        raise _UncachedResponse(e)
+    if response.status_code != 200:
+        raise _UncachedResponse(response.status_code)
+    return response.json()
+
+def fetch_json(url, params=None):
+    # None when the API or the statistics cube is unavailable; only successes are cached
+    try:
+        return _cached_json(url, params)
+    except (_UncachedResponse, ValueError):
+        return None
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _health():
+    # (healthy, model version): healthy is None if the API can't be reached
+    try:
+        response = api_session().get(HEALTH_URL, timeout=2)
+    except requests.exceptions.RequestException:
+        return None, None
+    if response.status_code != 200:
+        return False, None
+    try:
+        return True, response.json().get("model_version")
+    except ValueError:
+        return True, None
+
+def api_health():
+    # True / False for a healthy / failing API, None if it can't be reached
+    return _health()[0]
+
+def api_model_version():
+    # Version the API is serving, as of the last health check (at most 10 s old)
+    return _health()[1]
+
+@st.cache_data(ttl=300, max_entries=1000, show_spinner=False)
+def _cached_prediction(input_data, model_version):
+    # model_version is only part of the cache key: a reloaded model starts a fresh cache
+    response = api_session().post(API_URL, json=input_data, timeout=15)
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    result = {"status_code": response.status_code, "headers": dict(response.headers),
+              "json": body, "text": response.text}
+    if response.status_code != 200:
+        raise _UncachedResponse(result)
+    return result
+
+def request_prediction(input_data):
+    # Identical inputs are answered from the cache for a few minutes, per model version
+    try:
+        return _cached_prediction(input_data, api_model_version())
+    except _UncachedResponse as e:
+        return e.args[0]
+
+def suggest_values(field, query):
+    # Canonical spellings the model knows; empty if the API is unreachable
+    if not query.strip():
+        return []
+    result = fetch_json(SUGGEST_URL, params={"field": field, "q": query, "limit": 8})
+    return [s["value"] for s in result["suggestions"]] if result else []
+
+def pick_suggestion(field, label, typed):
+    # Offer the closest known values under a free-text input, keep the typed text otherwise
+    options = suggest_values(field, typed)
+    if not options or options[0] == typed.strip().upper():
+        return typed
+    keep = f"Use as typed: {typed.strip()}"
+    choice = st.selectbox(f"Did you mean ({label.lower()})?", options=options + [keep], key=f"suggest_{field}")
+    return typed if choice == keep else choice
 
 # Professional Government Header - WHITE TEXT
 st.markdown("""
@@ -431,12 +522,21 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("### 📊 Database Statistics")
     
+    # Real counts from the statistics cube, the published figures otherwise
+    summary = fetch_json(f"{STATS_URL}/summary")
+    if summary:
+        total_records = f"{summary['overall']['count']:,}"
+        total_titles = f"{summary['distinct']['CLASS_TITLE']:,}"
+        total_agencies = f"{summary['distinct']['AGENCY_NAME']:,}"
+    else:
+        total_records, total_titles, total_agencies = "149,481", "1,842", "109"
+
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Total Records", "149,481", "employees")
-        st.metric("Job Titles", "1,842", "unique")
+        st.metric("Total Records", total_records, "employees")
+        st.metric("Job Titles", total_titles, "unique")
     with col2:
-        st.metric("Agencies", "109", "covered")
+        st.metric("Agencies", total_agencies, "covered")
         st.metric("Features", "5", "inputs")
     
     st.markdown("---")
@@ -474,6 +574,7 @@ with col1:
         placeholder="Enter official agency name",
         help="Enter the complete name of the Texas state agency"
     )
+    agency_name = pick_suggestion("AGENCY_NAME", "Agency name", agency_name)
     
     class_title = st.text_input(
         "JOB CLASSIFICATION", 
@@ -481,6 +582,7 @@ with col1:
         placeholder="Enter job title or classification",
         help="Enter the official job title or classification code"
     )
+    class_title = pick_suggestion("CLASS_TITLE", "Job classification", class_title)
     
     ethnicity = st.selectbox(
         "ETHNICITY",
@@ -517,11 +619,6 @@ if predict_button:
     else:
         # Loading State
         with st.spinner('🔄 Processing data and generating prediction...'):
-            progress_bar = st.progress(0)
-            for i in range(100):
-                time.sleep(0.015)
-                progress_bar.progress(i + 1)
-            
             # Use the CORRECT field names that match your FastAPI schema
             input_data = {
                 "AGENCY_NAME": agency_name.strip().upper(),
@@ -538,23 +635,22 @@ if predict_button:
                     st.json(input_data)
                     st.write(f"**API URL:** {API_URL}")
                 
-                response = requests.post(API_URL, json=input_data, timeout=15)
+                response = request_prediction(input_data)
                 
                 # Show response details
                 with st.expander("🔍 Debug: Response Details", expanded=True):
-                    st.write(f"**Response Status Code:** {response.status_code}")
-                    st.write(f"**Response Headers:** {dict(response.headers)}")
+                    st.write(f"**Response Status Code:** {response['status_code']}")
+                    st.write(f"**Response Headers:** {response['headers']}")
                     
-                    try:
-                        response_json = response.json()
+                    if response["json"] is not None:
                         st.write("**Response JSON:**")
-                        st.json(response_json)
-                    except:
-                        st.write(f"**Response Text (raw):** {response.text}")
+                        st.json(response["json"])
+                    else:
+                        st.write(f"**Response Text (raw):** {response['text']}")
                 
-                if response.status_code == 200:
+                if response["status_code"] == 200:
                     # Try multiple possible response formats
-                    response_data = response.json()
+                    response_data = response["json"]
                     
                     # DEBUG: Show all keys in response
                     st.info(f"📋 Response keys: {list(response_data.keys())}")
@@ -615,15 +711,33 @@ if predict_button:
                         st.markdown(f'<div class="salary-amount">${estimated_salary:,.2f}</div>', unsafe_allow_html=True)
                         st.markdown('<p class="result-label">Estimated Annual Compensation</p>', unsafe_allow_html=True)
                         
-                        # Confidence Indicator
-                        st.markdown("""
+                        # Confidence Indicator: the observed range behind this prediction when the
+                        # API serves an artifact with leaf intervals, the model's overall fit otherwise
+                        interval = response_data.get("interval")
+                        if interval:
+                            confidence = (f"{interval['level']:.0%} of {interval['support']:,} similar employees earn "
+                                          f"${interval['lower']:,.0f} – ${interval['upper']:,.0f}")
+                        else:
+                            confidence = "High Confidence Estimate (R² = 0.832)"
+                        st.markdown(f"""
                         <div style="text-align: center;">
                             <span class="confidence-badge">
-                                <span>⭐</span> High Confidence Estimate (R² = 0.832)
+                                <span>⭐</span> {confidence}
                             </span>
                         </div>
                         """, unsafe_allow_html=True)
                         
+                        # Observed pay of comparable employees, if the API has the statistics cube
+                        observed = fetch_json(STATS_URL, params={**input_data, "min_count": 5})
+                        if observed:
+                            scope = " × ".join(observed["filters"].values()) or "all employees"
+                            st.markdown('<p class="section-title">📈 Observed Salaries</p>', unsafe_allow_html=True)
+                            col1, col2, col3 = st.columns(3)
+                            col1.metric("Observed Median", f"${observed['median']:,.0f}")
+                            col2.metric("Middle 50%", f"${observed['p25']:,.0f} – ${observed['p75']:,.0f}")
+                            col3.metric("Employees", f"{observed['count']:,}")
+                            st.caption(f"Based on {scope}")
+
                         # Breakdown Cards
                         st.markdown('<p class="section-title">💰 Compensation Breakdown</p>', unsafe_allow_html=True)
                         
@@ -684,8 +798,8 @@ if predict_button:
                                 st.rerun()
                 
                 else:
-                    st.error(f"❌ **API Error:** {response.status_code}")
-                    st.write(f"**Error details:** {response.text}")
+                    st.error(f"❌ **API Error:** {response['status_code']}")
+                    st.write(f"**Error details:** {response['text']}")
                     st.info("""
                     **Common issues:**
                     1. FastAPI server not running
@@ -714,14 +828,14 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("### 🔧 System Status")
     
-    try:
-        health_response = requests.get("http://127.0.0.1:8000/health", timeout=5)
-        if health_response.status_code == 200:
-            st.success("✅ API Connected")
-        else:
-            st.error("❌ API Error")
-    except:
+    # Cached for a few seconds, so reruns don't wait on the API
+    healthy = api_health()
+    if healthy:
+        st.success("✅ API Connected")
+    elif healthy is None:
         st.error("❌ API Offline")
+    else:
+        st.error("❌ API Error")
 
 # Official Footer
 st.markdown("---")
@@ -0,0 +1,53 @@
+# benchmarks/bench_batching.py
+"""Throughput of /predict with and without micro-batching.
+
+    python benchmarks/bench_batching.py [concurrency] [n_requests]
+
+Many concurrent clients call main.predict_salary in-process; the response
+cache is disabled so every request reaches the model.
+"""
+import asyncio
+import logging
+import sys
+import time
+
+from workload import model_vocabulary, percentiles, zipf_requests
+
+import main  # noqa: E402
+from micro_batcher import MicroBatcher
+from prediction_cache import PredictionCache
+
+
+async def run(requests, concurrency):
+    queue = list(reversed(requests))
+    samples = []
+
+    async def client():
+        while queue:
+            record = queue.pop()
+            started = time.perf_counter()
+            await main.predict_salary(main.SalaryInput(**record))
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {"throughput_rps": len(requests) / elapsed, **percentiles(samples)}
+
+
+if __name__ == "__main__":
+    logging.getLogger("main").setLevel(logging.WARNING)
+    logging.getLogger("main.requests").setLevel(logging.WARNING)
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    requests = zipf_requests(model_vocabulary(main.model_state), n_requests)
+    main.prediction_cache = PredictionCache(maxsize=0)
+    main.inference_pool.max_queue = n_requests
+
+    for label, batch_size in [("unbatched", 0), ("batched", 64)]:
+        main.micro_batcher = (MicroBatcher(main._run_micro_batch, max_batch_size=batch_size, max_wait_ms=2)
+                              if batch_size else None)
+        result = asyncio.run(run(requests, concurrency))
+        print(f"{label:>9}: " + ", ".join(f"{k}={v:,.1f}" for k, v in result.items()))
+        if main.micro_batcher is not None:
+            print(f"           {main.micro_batcher.stats()}")
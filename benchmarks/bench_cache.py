@@ -0,0 +1,43 @@
+# benchmarks/bench_cache.py
+"""Latency of predict_salary with and without the response cache.
+
+    python benchmarks/bench_cache.py [n_requests]
+
+Replays a Zipf-distributed request mix through main.predict_salary in-process.
+"""
+import asyncio
+import logging
+import sys
+import time
+
+from workload import model_vocabulary, percentiles, zipf_requests
+
+import main  # noqa: E402
+from prediction_cache import PredictionCache
+
+
+async def run(requests):
+    samples = []
+    for record in requests:
+        started = time.perf_counter()
+        await main.predict_salary(main.SalaryInput(**record))
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+if __name__ == "__main__":
+    logging.getLogger("main").setLevel(logging.WARNING)
+    logging.getLogger("main.requests").setLevel(logging.WARNING)
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    requests = zipf_requests(model_vocabulary(main.model_state), n_requests)
+
+    results = {}
+    for label, size in [("no cache", 0), ("cache", 10000)]:
+        main.prediction_cache = PredictionCache(maxsize=size, ttl=3600)
+        results[label] = asyncio.run(run(requests))
+        stats = main.prediction_cache.stats()
+        print(f"{label:>9}: " + ", ".join(f"{k}={v:,.1f}" for k, v in results[label].items())
+              + f", hit_rate={stats['hit_rate']:.1%}")
+
+    speedup = results["no cache"]["mean_us"] / results["cache"]["mean_us"]
+    print(f"mean speedup: {speedup:.1f}x")
@@ -0,0 +1,59 @@
+# benchmarks/bench_cold_start.py
+"""Cold start time and import-time memory: pickle vs slim .npz artifact.
+
+    python export_model.py model_simple.pkl model_simple.npz
+    python benchmarks/bench_cold_start.py [model_simple.pkl] [model_simple.npz] [runs]
+
+Each run is a fresh interpreter that imports main (which loads the model) and
+serves one request through the compiled/sklearn path.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from workload import REPO_ROOT
+
+CHILD = r"""
+import json, resource, sys, time
+started = time.perf_counter()
+import main
+loaded = time.perf_counter() - started
+record = main.CANARY_INPUT
+main._predict_one(None, record)
+first = time.perf_counter() - started
+heavy = [m for m in ("pandas", "sklearn", "joblib", "category_encoders", "scipy") if m in sys.modules]
+print(json.dumps({
+    "import_and_load_s": loaded,
+    "first_prediction_s": first,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules": heavy,
+}))
+"""
+
+
+def measure(model_path, runs):
+    # The child runs from the repo root: resolve the path against ours first
+    env = dict(os.environ, SALARY_MODEL_PATH=os.path.abspath(model_path), SALARY_CACHE_SIZE="0")
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", CHILD], cwd=REPO_ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "import_and_load_s": statistics.median(r["import_and_load_s"] for r in results),
+        "first_prediction_s": statistics.median(r["first_prediction_s"] for r in results),
+        "max_rss_mb": statistics.median(r["max_rss_mb"] for r in results),
+        "heavy_modules": results[0]["heavy_modules"],
+    }
+
+
+if __name__ == "__main__":
+    pickle_path = sys.argv[1] if len(sys.argv) > 1 else "model_simple.pkl"
+    artifact_path = sys.argv[2] if len(sys.argv) > 2 else "model_simple.npz"
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    for path in (pickle_path, artifact_path):
+        r = measure(path, runs)
+        print(f"{path:>20}: load {r['import_and_load_s']:.3f}s, first prediction {r['first_prediction_s']:.3f}s, "
+              f"max RSS {r['max_rss_mb']:.1f} MB, heavy imports: {', '.join(r['heavy_modules']) or 'none'}")
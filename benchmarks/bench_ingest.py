@@ -0,0 +1,65 @@
+# benchmarks/bench_ingest.py
+"""Load time and peak memory: pd.read_csv vs the ingest.py columnar cache.
+
+    python benchmarks/bench_ingest.py [salary.csv] [runs]
+
+Each loader runs in a fresh interpreter; peak memory is the growth of max RSS
+over the interpreter's footprint right after importing pandas. The cache run
+also checks that every column (categorical codes included) is still a view
+of its memory-mapped file, and fails if any was copied.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from workload import REPO_ROOT
+
+CHILD = r"""
+import json, resource, sys, time
+import pandas as pd
+import ingest
+loader, path = sys.argv[1], sys.argv[2]
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+if loader == "read_csv":
+    frame = pd.read_csv(path)
+else:
+    frame = ingest.load(path)
+    # Touch the data like a training run would
+    frame["ANNUAL"].sum()
+elapsed = time.perf_counter() - started
+if loader != "read_csv":
+    copied = [name for name in frame.columns if not ingest.is_memory_mapped(
+        frame[name].array.codes if isinstance(frame[name].dtype, pd.CategoricalDtype) else frame[name].to_numpy())]
+    assert not copied, f"columns copied out of the cache: {copied}"
+print(json.dumps({
+    "seconds": elapsed,
+    "peak_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024,
+    "frame_mb": frame.memory_usage(deep=True).sum() / 2**20,
+}))
+"""
+
+
+def measure(loader, path, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", CHILD, loader, path], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {k: statistics.median(r[k] for r in results) for k in results[0]}
+
+
+if __name__ == "__main__":
+    csv_path = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else "salary.csv")
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with tempfile.TemporaryDirectory() as cache_dir:
+        sys.path.insert(0, REPO_ROOT)
+        import ingest
+        ingest.build(csv_path, cache_dir)
+        for loader, path in [("read_csv", csv_path), ("ingest cache", cache_dir)]:
+            r = measure(loader, path, runs)
+            print(f"{loader:>13}: {r['seconds']:.3f}s, peak +{r['peak_mb']:.1f} MB, "
+                  f"frame {r['frame_mb']:.1f} MB")
@@ -0,0 +1,85 @@
+# benchmarks/bench_logging.py
+"""Request throughput with per-request logging at full verbosity vs sampled.
+
+    python benchmarks/bench_logging.py [n_requests]
+
+Replays a Zipf request mix through main.predict_salary in-process, with the
+compiled model and the response cache on so logging is a visible share of the
+work. Log output goes to a temporary file.
+"""
+import asyncio
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SALARY_COMPILED_MODEL", "1")
+
+from workload import model_vocabulary, zipf_requests
+
+import main  # noqa: E402
+from log_config import _DeferredQueueHandler
+from logging.handlers import QueueListener
+
+CONFIGS = [
+    # label, async, hot path level, sample rate
+    ("sync, full", False, logging.INFO, 1.0),
+    ("async, full", True, logging.INFO, 1.0),
+    ("async, 1% sampled", True, logging.INFO, 0.01),
+    ("hot path off", False, logging.WARNING, 1.0),
+]
+
+
+def configure(path, async_mode, hot_level, sample_rate):
+    root = logging.getLogger()
+    file_handler = logging.FileHandler(path)
+    file_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    listener = None
+    if async_mode:
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, file_handler)
+        listener.start()
+        root.handlers = [_DeferredQueueHandler(records)]
+    else:
+        root.handlers = [file_handler]
+    root.setLevel(logging.INFO)
+
+    main.request_logger.logger.setLevel(hot_level)
+    main.request_logger.rate = sample_rate
+    # Same cache hit/miss pattern for every configuration
+    main.prediction_cache.clear()
+    return file_handler, listener
+
+
+async def run(requests):
+    started = time.perf_counter()
+    for record in requests:
+        await main.predict_salary(main.SalaryInput(**record))
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    requests = zipf_requests(model_vocabulary(main.model_state), n_requests)
+    asyncio.run(run(requests[:500]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for label, async_mode, hot_level, sample_rate in CONFIGS:
+            path = os.path.join(tmp, label.replace(" ", "_").replace(",", "").replace("%", "") + ".log")
+            file_handler, listener = configure(path, async_mode, hot_level, sample_rate)
+            elapsed = asyncio.run(run(requests))
+            # Time left to drain the queue once the requests are done
+            drained = time.perf_counter()
+            if listener is not None:
+                listener.stop()
+            drained = time.perf_counter() - drained
+            file_handler.close()
+            throughput = n_requests / elapsed
+            baseline = baseline or throughput
+            with open(path, encoding="utf-8") as f:
+                lines = sum(1 for _ in f)
+            print(f"{label:>18}: {throughput:>9,.0f} req/s ({throughput / baseline:.2f}x), "
+                  f"{lines:,} log lines, drain {drained * 1000:.0f} ms")
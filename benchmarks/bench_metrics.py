@@ -0,0 +1,74 @@
+# benchmarks/bench_metrics.py
+"""Overhead of the /metrics instrumentation.
+
+    python benchmarks/bench_metrics.py [n_requests]
+
+Times the individual metric updates, then replays a Zipf request mix through
+the full ASGI app (TestClient) with the metric updates enabled and stubbed out.
+"""
+import logging
+import sys
+import time
+
+from workload import model_vocabulary, percentiles, zipf_requests
+
+import main  # noqa: E402
+from fastapi.testclient import TestClient
+from prediction_cache import PredictionCache
+
+METRICS = [main.REQUESTS, main.REQUEST_ERRORS, main.REQUEST_SECONDS, main.STAGE_SECONDS,
+           main.ROW_ERRORS, main.CACHE_LOOKUPS]
+
+
+def per_call_ns(fn, n=200_000):
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - started) / n * 1e9
+
+
+def replay(client, requests):
+    samples = []
+    for record in requests:
+        started = time.perf_counter()
+        client.post("/predict", json=record)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def set_enabled(enabled):
+    noop = lambda *args, **kwargs: None  # noqa: E731
+    for metric in METRICS:
+        for name in ("inc", "observe"):
+            if enabled:
+                metric.__dict__.pop(name, None)
+            elif hasattr(metric, name):
+                setattr(metric, name, noop)
+
+
+if __name__ == "__main__":
+    logging.getLogger("main").setLevel(logging.WARNING)
+    logging.getLogger("main.requests").setLevel(logging.WARNING)
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    print(f"Counter.inc:       {per_call_ns(lambda: main.CACHE_LOOKUPS.inc('local', 'hit')):,.0f} ns")
+    print(f"Histogram.observe: {per_call_ns(lambda: main.STAGE_SECONDS.observe(0.0003, 'model')):,.0f} ns")
+    started = time.perf_counter()
+    body = main.registry.render()
+    print(f"render:            {(time.perf_counter() - started) * 1e3:.2f} ms ({len(body):,} bytes)")
+
+    # No response cache, so every request goes through all the stages
+    main.prediction_cache = PredictionCache(maxsize=0, ttl=3600)
+    requests = zipf_requests(model_vocabulary(main.model_state), n_requests)
+    client = TestClient(main.app)
+    replay(client, requests[:200])
+
+    results = {}
+    for label, enabled in [("metrics off", False), ("metrics on", True)]:
+        set_enabled(enabled)
+        results[label] = replay(client, requests)
+        print(f"{label:>11}: " + ", ".join(f"{k}={v:,.1f}" for k, v in results[label].items()))
+
+    overhead = results["metrics on"]["mean_us"] - results["metrics off"]["mean_us"]
+    print(f"overhead: {overhead:+,.1f} us/request "
+          f"({overhead / results['metrics off']['mean_us']:+.1%})")
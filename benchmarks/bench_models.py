@@ -0,0 +1,91 @@
+# benchmarks/bench_models.py
+"""Decision tree vs histogram gradient boosting: accuracy and inference latency.
+
+    python benchmarks/bench_models.py [salary.csv] [n_requests] [batch_rows]
+
+Fits both train.py pipelines (default parameters, no search) on the same 80/20
+split and reports test accuracy, then times every way of scoring them:
+
+    sklearn            model.predict on a one-row / batch DataFrame
+    compiled           compile_pipeline(): the flattened tree, or the ensemble's tables
+    compiled (walk)    the ensemble with every tree walked (max_cells=0), no tables
+
+Single-row latency replays a Zipf request mix one record at a time (sklearn on
+the first 1,000 only, it is slow); batch latency is the median of scoring
+batch_rows records at once.
+"""
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from workload import category_requests, percentiles, zipf_requests
+
+from compiled_model import CompiledEnsemble, FEATURE_COLUMNS, compile_pipeline  # noqa: E402
+from train import MODELS, load_training_data, train  # noqa: E402
+
+
+def single_row(predict, requests):
+    samples = []
+    for record in requests:
+        started = time.perf_counter()
+        predict(record)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def batch(predict, records, repeats=7):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        predict(records)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def backends(model, compiled):
+    yield "sklearn", (lambda r: model.predict(pd.DataFrame([r], columns=FEATURE_COLUMNS))[0],
+                      lambda rs: model.predict(pd.DataFrame(rs, columns=FEATURE_COLUMNS)))
+    yield "compiled", (compiled.predict_one, compiled.predict_records)
+    if isinstance(compiled, CompiledEnsemble):
+        walked = CompiledEnsemble.from_pipeline(model, max_cells=0)
+        yield "compiled (walk)", (walked.predict_one, walked.predict_records)
+
+
+if __name__ == "__main__":
+    data = sys.argv[1] if len(sys.argv) > 1 else "salary.csv"
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    batch_rows = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    if not os.path.exists(data):
+        sys.exit(f"❌ {data} not found")
+
+    X, y = load_training_data(data)
+    print(f"{len(X):,} rows, test split 20%\n")
+    print(f"{'model':>6} {'test R²':>8} {'MAE':>10} {'RMSE':>10} {'fit s':>7}  compiled")
+    fitted = {}
+    for name in MODELS:
+        started = time.perf_counter()
+        model, _, metrics, _ = train(X, y, search=False, cache_dir=None, model=name)
+        fit_s = time.perf_counter() - started
+        compiled = compile_pipeline(model)
+        fitted[name] = (model, compiled)
+        print(f"{name:>6} {metrics['r2']:>8.4f} {metrics['mae']:>10,.0f} {metrics['rmse']:>10,.0f} "
+              f"{fit_s:>7.2f}  {compiled.summary}")
+
+    vocabulary = {f: sorted(fitted["tree"][1].vocabularies[f]) for f in FEATURE_COLUMNS}
+    requests = zipf_requests(vocabulary, n_requests)
+    records = category_requests(vocabulary, batch_rows, seed=2)
+
+    print(f"\n{'model':>6} {'backend':>16} {'p50 µs':>9} {'p99 µs':>9} {f'batch {batch_rows:,} ms':>16}")
+    for name, (model, compiled) in fitted.items():
+        for label, (one, many) in backends(model, compiled):
+            replay = requests[:1000] if label == "sklearn" else requests
+            one(replay[0])
+            latency = single_row(one, replay)
+            expected = np.asarray(model.predict(pd.DataFrame(records[:100], columns=FEATURE_COLUMNS)))
+            assert np.allclose(np.asarray(many(records[:100])), expected), label
+            print(f"{name:>6} {label:>16} {latency['p50_us']:>9,.1f} {latency['p99_us']:>9,.1f} "
+                  f"{batch(many, records):>16,.2f}")
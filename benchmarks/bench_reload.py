@@ -0,0 +1,75 @@
+# benchmarks/bench_reload.py
+"""Latency and failures of /predict while the model is hot-reloaded.
+
+    python benchmarks/bench_reload.py [concurrency] [seconds] [reloads]
+
+Concurrent in-process clients call main.predict_salary (cache disabled) while a
+background thread reloads model_simple.pkl every few hundred ms. Latencies are
+split by whether a reload was in progress when the request started.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+
+from workload import model_vocabulary, percentiles, zipf_requests
+
+import main  # noqa: E402
+from prediction_cache import PredictionCache
+
+
+async def run(requests, concurrency, seconds, reloading):
+    samples = {"steady": [], "during reload": []}
+    failures = []
+    deadline = time.perf_counter() + seconds
+
+    async def client(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            record = requests[i % len(requests)]
+            i += concurrency
+            swapping = reloading.is_set()
+            started = time.perf_counter()
+            try:
+                await main.predict_salary(main.SalaryInput(**record))
+            except Exception as e:
+                failures.append(repr(e))
+                continue
+            elapsed = time.perf_counter() - started
+            samples["during reload" if swapping or reloading.is_set() else "steady"].append(elapsed)
+
+    await asyncio.gather(*[client(k) for k in range(concurrency)])
+    return samples, failures
+
+
+def reloader(n_reloads, seconds, reloading):
+    for _ in range(n_reloads):
+        time.sleep(seconds / (n_reloads + 1))
+        reloading.set()
+        main.load_model()
+        reloading.clear()
+
+
+if __name__ == "__main__":
+    logging.getLogger("main").setLevel(logging.WARNING)
+    logging.getLogger("main.requests").setLevel(logging.WARNING)
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    n_reloads = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    requests = zipf_requests(model_vocabulary(main.model_state), 5000)
+    main.prediction_cache = PredictionCache(maxsize=0)
+
+    reloading = threading.Event()
+    thread = threading.Thread(target=reloader, args=(n_reloads, seconds, reloading), daemon=True)
+    thread.start()
+    samples, failures = asyncio.run(run(requests, concurrency, seconds, reloading))
+    thread.join()
+
+    for label, values in samples.items():
+        if values:
+            print(f"{label:>13}: n={len(values)}, " + ", ".join(f"{k}={v:,.1f}" for k, v in percentiles(values).items()))
+    print(f"reloads={n_reloads}, failed requests={len(failures)}")
+    for failure in failures[:5]:
+        print(f"  {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,105 @@
+# benchmarks/bench_shared_cache.py
+"""Cache hit rates and latency across worker processes, with and without the shared tier.
+
+    python benchmarks/bench_shared_cache.py [n_requests] [workers] [local_size]
+    SALARY_COMPILED_MODEL=1 python benchmarks/bench_shared_cache.py
+
+Loads the model once and forks the workers like serve.py. The same Zipf
+request mix is dealt round-robin to 1..workers processes, as a load balancer
+would, and each replays its share through main.predict_salary at the same
+time. "local" gives every worker only its own PredictionCache; "local+shared"
+adds a SharedCache in /dev/shm that all of them use.
+
+Hit rates are per tier: local hits out of all lookups, shared hits out of the
+lookups that missed locally. "model calls" counts the predictions that were
+actually computed.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from workload import model_vocabulary, percentiles, zipf_requests
+
+import main  # noqa: E402
+from prediction_cache import PredictionCache
+from shared_cache import SharedCache
+
+
+def worker(requests, local_size, shared_path, barrier, results):
+    main.prediction_cache = PredictionCache(maxsize=local_size, ttl=3600)
+    main.shared_cache = SharedCache(shared_path, ttl=3600) if shared_path else None
+
+    async def replay():
+        samples = []
+        for record in requests:
+            started = time.perf_counter()
+            await main.predict_salary(main.SalaryInput(**record))
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    barrier.wait()
+    started = time.perf_counter()
+    samples = asyncio.run(replay())
+    local = main.prediction_cache.stats()
+    shared = main.shared_cache.stats() if main.shared_cache is not None else {"hits": 0, "misses": 0}
+    results.put({"samples": samples, "seconds": time.perf_counter() - started,
+                 "local_hits": local["hits"], "local_misses": local["misses"],
+                 "shared_hits": shared["hits"], "shared_misses": shared["misses"]})
+
+
+def run(requests, n_workers, local_size, shared_path):
+    if shared_path and os.path.exists(shared_path):
+        os.remove(shared_path)
+    ctx = multiprocessing.get_context("fork")
+    barrier, results = ctx.Barrier(n_workers), ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(requests[i::n_workers], local_size, shared_path, barrier, results))
+                 for i in range(n_workers)]
+    for p in processes:
+        p.start()
+    out = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    if shared_path:
+        os.remove(shared_path)
+
+    total = {k: sum(r[k] for r in out) for k in ("local_hits", "local_misses", "shared_hits", "shared_misses")}
+    lookups = total["local_hits"] + total["local_misses"]
+    model_calls = total["local_misses"] - total["shared_hits"]
+    latency = percentiles([s for r in out for s in r["samples"]])
+    return {
+        "local_hit_rate": total["local_hits"] / lookups,
+        "shared_hit_rate": total["shared_hits"] / total["local_misses"] if shared_path and total["local_misses"] else None,
+        "hit_rate": 1 - model_calls / lookups,
+        "model_calls": model_calls,
+        "throughput": len(requests) / max(r["seconds"] for r in out),
+        **latency,
+    }
+
+
+if __name__ == "__main__":
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    local_size = int(sys.argv[3]) if len(sys.argv) > 3 else main.CACHE_SIZE
+    logging.getLogger("main").setLevel(logging.WARNING)
+    logging.getLogger("main.requests").setLevel(logging.WARNING)
+
+    requests = zipf_requests(model_vocabulary(main.model_state), n_requests)
+    shm = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    shared_path = os.path.join(shm, f"bench_shared_cache_{os.getpid()}")
+    model = "compiled" if main.model_state.compiled is not None else "sklearn pipeline"
+    print(f"{n_requests:,} requests ({len({tuple(r.values()) for r in requests}):,} distinct), "
+          f"local cache {local_size:,} per worker, {model}, {os.cpu_count()} CPUs\n")
+    print(f"{'workers':>7} {'tiers':>13} {'local hit':>10} {'shared hit':>11} {'overall':>8} "
+          f"{'model calls':>12} {'p50 µs':>8} {'p99 µs':>9} {'req/s':>9}")
+    n_workers = 1
+    while n_workers <= max_workers:
+        for label, path in [("local", None), ("local+shared", shared_path)]:
+            r = run(requests, n_workers, local_size, path)
+            shared = f"{r['shared_hit_rate']:.1%}" if r["shared_hit_rate"] is not None else "-"
+            print(f"{n_workers:>7} {label:>13} {r['local_hit_rate']:>10.1%} {shared:>11} {r['hit_rate']:>8.1%} "
+                  f"{r['model_calls']:>12,} {r['p50_us']:>8,.1f} {r['p99_us']:>9,.1f} {r['throughput']:>9,.0f}")
+        n_workers *= 2
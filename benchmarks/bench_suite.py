@@ -0,0 +1,203 @@
+# benchmarks/bench_suite.py
+"""Benchmark suite for the API, with machine-readable results and a regression check.
+
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --url http://127.0.0.1:8000 --concurrency 1,16,64
+    python benchmarks/bench_suite.py --baseline baseline.json --max-regression 0.15
+
+Load tests replay request mixes through /predict, either in-process (the ASGI
+app over httpx, no sockets) or against a running server with --url:
+
+    zipf        5,000 distinct combinations with Zipf popularity (cache friendly)
+    categories  every field drawn from its own distribution: salary.csv value
+                counts with --data, otherwise a Zipf law over the categories
+    unique      uniform over every field, practically no repeats (cold cache)
+
+Each mix runs at every --concurrency level and reports throughput and
+p50/p95/p99 latency. Micro-benchmarks time SalaryInput validation and the
+model on its own. With --baseline the run fails (exit 1) when throughput
+drops, or p50/p95 latency grows, by more than --max-regression.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import platform
+import sys
+import time
+
+from workload import category_requests, model_vocabulary, percentiles, salary_frequencies, zipf_requests
+
+import main  # noqa: E402
+import httpx
+from compiled_model import FEATURE_COLUMNS, compile_pipeline
+
+
+def build_mixes(vocabulary, n_requests, data=None):
+    frequencies = salary_frequencies(data) if data else None
+    return {
+        "zipf": zipf_requests(vocabulary, n_requests),
+        "categories": category_requests(vocabulary, n_requests, frequencies),
+        # Uniform draw per field: practically no combination repeats
+        "unique": category_requests(vocabulary, n_requests, exponent=0.0, seed=1),
+    }
+
+
+async def load_test(client, requests, concurrency):
+    pending = list(reversed(requests))
+    samples, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while pending:
+            record = pending.pop()
+            started = time.perf_counter()
+            response = await client.post("/predict", json=record)
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {"throughput_rps": len(requests) / elapsed, "errors": errors, **percentiles(samples)}
+
+
+async def run_load(url, mixes, concurrency_levels):
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=60,
+                                   limits=httpx.Limits(max_connections=max(concurrency_levels)))
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench")
+    results = []
+    async with client:
+        for mix, requests in mixes.items():
+            await load_test(client, requests[:200], 8)  # warm-up
+            for concurrency in concurrency_levels:
+                if not url:
+                    # Every run starts from the same cache state
+                    main.prediction_cache.clear()
+                result = await load_test(client, requests, concurrency)
+                results.append({"mix": mix, "concurrency": concurrency, **result})
+                print(f"{mix:>10} x{concurrency:<4} " + ", ".join(
+                    f"{k}={v:,.1f}" for k, v in result.items()))
+    return results
+
+
+def time_each(fn, items, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            started = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def run_micro(state, records):
+    import pandas as pd
+
+    results = {"validate_salary_input": time_each(main.SalaryInput.model_validate, records)}
+    if state.model is not None:
+        frames = [pd.DataFrame([r], columns=FEATURE_COLUMNS) for r in records[:500]]
+        results["model_predict_1_row"] = time_each(state.model.predict, frames)
+        batch = pd.DataFrame(records[:1000], columns=FEATURE_COLUMNS)
+        results["model_predict_1000_rows"] = time_each(state.model.predict, [batch], repeat=20)
+    compiled = state.compiled or compile_pipeline(state.model)
+    results["compiled_predict_one"] = time_each(compiled.predict_one, records)
+    for name, result in results.items():
+        print(f"{name:>24}: " + ", ".join(f"{k}={v:,.1f}" for k, v in result.items()))
+    return results
+
+
+def regressions(results, baseline, max_regression):
+    """Compare two result files; returns a list of human-readable failures."""
+    failures = []
+
+    def check(name, metric, current, previous, higher_is_better):
+        if not previous:
+            return
+        change = (current - previous) / previous
+        if (-change if higher_is_better else change) > max_regression:
+            failures.append(f"{name} {metric}: {previous:,.1f} -> {current:,.1f} ({change:+.1%})")
+
+    previous_load = {(r["mix"], r["concurrency"]): r for r in baseline.get("load", [])}
+    for r in results.get("load", []):
+        before = previous_load.get((r["mix"], r["concurrency"]))
+        if before is None:
+            continue
+        name = f"load {r['mix']} x{r['concurrency']}"
+        check(name, "throughput_rps", r["throughput_rps"], before["throughput_rps"], True)
+        # p99 is reported but too noisy to gate on
+        for metric in ("p50_us", "p95_us"):
+            check(name, metric, r[metric], before[metric], False)
+    for name, r in results.get("micro", {}).items():
+        before = baseline.get("micro", {}).get(name)
+        if before is not None:
+            for metric in ("p50_us", "p95_us"):
+                check(f"micro {name}", metric, r[metric], before[metric], False)
+    return failures
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite for the salary API")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=5000, help="requests per mix and concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="comma-separated concurrency levels")
+    parser.add_argument("--mixes", default="zipf,categories,unique")
+    parser.add_argument("--data", help="salary.csv (or ingest cache) for the categories mix")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="allowed relative slowdown before failing (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("main").setLevel(logging.WARNING)
+    logging.getLogger("main.requests").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # Vocabulary comes from the local model, also when benchmarking --url
+    state = main.model_state
+    vocabulary = model_vocabulary(state)
+    mixes = build_mixes(vocabulary, args.requests, args.data)
+    mixes = {name: mixes[name] for name in args.mixes.split(",")}
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    if not args.url:
+        main.inference_pool.max_queue = max(main.inference_pool.max_queue, max(concurrency_levels))
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "target": args.url or "in-process",
+            "model_version": state.version,
+            "requests": args.requests,
+        }
+    }
+    if not args.skip_load:
+        results["load"] = asyncio.run(run_load(args.url, mixes, concurrency_levels))
+    if not args.skip_micro:
+        results["micro"] = run_micro(state, mixes["zipf"] if "zipf" in mixes else next(iter(mixes.values())))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = regressions(results, json.load(f), args.max_regression)
+        if failures:
+            print(f"❌ {len(failures)} regression(s) over {args.max_regression:.0%}:")
+            for failure in failures:
+                print(f"   {failure}")
+            return 1
+        print(f"✅ No regressions over {args.max_regression:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
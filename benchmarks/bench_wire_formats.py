@@ -0,0 +1,132 @@
+# benchmarks/bench_wire_formats.py
+"""Bytes on the wire and server CPU per 10K predictions for each wire format.
+
+    python benchmarks/bench_wire_formats.py [rows] [repeats]
+
+Sends one batch of `rows` predictions per format through the in-process app
+(httpx over ASGI, no sockets) and reports request/response sizes and the
+process CPU time per call. Bodies are encoded up front and responses are not
+decoded, so the CPU is the server's: parsing, validation, scoring and encoding.
+
+The codec columns time decoding the request and encoding the response on
+their own. "json (stdlib)" is the old path, json.loads plus dict validation
+and a stdlib JSONResponse, for comparison.
+"""
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SALARY_COMPILED_MODEL", "1")
+
+from workload import model_vocabulary, zipf_requests
+
+import main  # noqa: E402
+import httpx
+import wire_formats
+from fastapi.responses import JSONResponse
+from compiled_model import FEATURE_COLUMNS
+
+
+# label, wire format, endpoint
+CASES = [
+    ("json", "json", "/predict/batch/columnar"),
+    ("msgpack", "msgpack", "/predict/batch/columnar"),
+    ("arrow", "arrow", "/predict/batch/columnar"),
+    ("json records", "json", "/predict/batch"),
+    ("ndjson", "ndjson", "/predict/batch"),
+]
+
+
+def encode_request(fmt, path, records):
+    columns = {name: [r[name] for r in records] for name in FEATURE_COLUMNS}
+    if path == "/predict/batch":
+        if fmt == "ndjson":
+            return b"".join(wire_formats.dumps_json(r) + b"\n" for r in records)
+        return wire_formats.dumps_json({"records": records})
+    if fmt == "arrow":
+        import pyarrow as pa
+        # Dictionary-encoded strings: each distinct value is sent once
+        table = pa.table({name: pa.array(values).dictionary_encode() for name, values in columns.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if fmt == "msgpack":
+        import msgpack
+        return msgpack.packb(columns)
+    return wire_formats.dumps_json(columns)
+
+
+def codec_cpu(fmt, path, body, content, repeats):
+    """Median CPU seconds to decode the request and encode the response content."""
+    model = main.SalaryBatchInput if path == "/predict/batch" else main.SalaryColumnarInput
+    table = {"Estimated_Annual_Salary": content["Estimated_Annual_Salaries"]}
+    samples = []
+    for _ in range(repeats):
+        started = time.process_time()
+        if fmt == "json (stdlib)":
+            model.model_validate(json.loads(body))
+            JSONResponse(content=content)
+        elif fmt == "json":
+            model.model_validate_json(body)
+            wire_formats.encode("json", content)
+        else:
+            data = wire_formats.decode(body, fmt)
+            model.model_validate({"records": data} if fmt == "ndjson" else data)
+            encoded = wire_formats.encode(fmt, content, table, ("Estimated_Annual_Salaries",))
+            if fmt == "ndjson":
+                b"".join(encoded)
+        samples.append(time.process_time() - started)
+    return statistics.median(samples)
+
+
+async def server_cpu(client, path, fmt, body, repeats):
+    headers = {"content-type": wire_formats.MEDIA_TYPES[fmt], "accept": wire_formats.MEDIA_TYPES[fmt]}
+    samples, response = [], None
+    for _ in range(repeats + 1):
+        started = time.process_time()
+        response = await client.post(path, content=body, headers=headers)
+        samples.append(time.process_time() - started)
+        assert response.status_code == 200, response.text
+    # First call warms up caches and imports
+    return statistics.median(samples[1:]), response.content
+
+
+async def run(rows, repeats):
+    records = zipf_requests(model_vocabulary(main.model_state), rows)
+    cases = [case for case in CASES if case[1] in wire_formats.AVAILABLE]
+    per_10k = 10000 / rows
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for label, fmt, path in cases:
+            body = encode_request(fmt, path, records)
+            cpu, response = await server_cpu(client, path, fmt, body, repeats)
+            results.append((label, fmt, path, body, response, cpu))
+
+    # Same response content for every codec timing
+    content = json.loads(results[0][4])
+    json_body = results[0][3]
+    print(f"{rows:,} rows per request, figures scaled to 10K predictions\n")
+    print(f"{'format':>14} {'request KB':>11} {'response KB':>12} {'server CPU ms':>14} {'codec CPU ms':>13}")
+    stdlib_codec = codec_cpu("json (stdlib)", "/predict/batch/columnar", json_body, content, repeats)
+    response_size = len(JSONResponse(content=content).body)
+    print(f"{'json (stdlib)':>14} {len(json_body) * per_10k / 1024:>11,.1f} "
+          f"{response_size * per_10k / 1024:>12,.1f} {'':>14} {stdlib_codec * per_10k * 1000:>13,.1f}")
+    for label, fmt, path, body, response, cpu in results:
+        codec = codec_cpu(fmt, path, body, content, repeats)
+        print(f"{label:>14} {len(body) * per_10k / 1024:>11,.1f} {len(response) * per_10k / 1024:>12,.1f} "
+              f"{cpu * per_10k * 1000:>14,.1f} {codec * per_10k * 1000:>13,.1f}")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    logging.getLogger("main").setLevel(logging.WARNING)
+    logging.getLogger("main.requests").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(run(rows, repeats))
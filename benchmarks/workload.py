@@ -0,0 +1,76 @@
+# benchmarks/workload.py
+"""Shared helpers for building realistic request mixes."""
+import os
+import sys
+
+import numpy as np
+
+# Benchmarks run from the repo root: python benchmarks/<script>.py
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from compiled_model import FEATURE_COLUMNS, compile_pipeline  # noqa: E402
+
+
+def model_vocabulary(state):
+    """Known categories per SalaryInput field for a main.ModelState."""
+    compiled = state.compiled or compile_pipeline(state.model)
+    return {f: sorted(compiled.vocabularies[f]) for f in FEATURE_COLUMNS}
+
+
+def zipf_requests(vocabulary, n_requests, n_distinct=5000, exponent=1.1, seed=0):
+    """Draw n_requests records from a pool of n_distinct combinations.
+
+    Popularity of the pool entries follows a Zipf law, so a few agency/title
+    combinations dominate the traffic like they do in production.
+    """
+    rng = np.random.default_rng(seed)
+    pool = [
+        {f: vocabulary[f][rng.integers(len(vocabulary[f]))] for f in FEATURE_COLUMNS}
+        for _ in range(n_distinct)
+    ]
+    ranks = np.arange(1, n_distinct + 1, dtype=np.float64)
+    weights = ranks ** -exponent
+    picks = rng.choice(n_distinct, size=n_requests, p=weights / weights.sum())
+    return [pool[i] for i in picks]
+
+
+def category_requests(vocabulary, n_requests, frequencies=None, exponent=1.1, seed=0):
+    """Draw every field independently from its own category distribution.
+
+    frequencies maps field -> {value: count} (see salary_frequencies); fields
+    without one get a Zipf law over a shuffled vocabulary, so a handful of
+    agencies and titles take most of the traffic.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for f in FEATURE_COLUMNS:
+        counts = (frequencies or {}).get(f)
+        if counts:
+            known = set(vocabulary[f])
+            values = [v for v in counts if v in known]
+            weights = np.array([counts[v] for v in values], dtype=np.float64)
+        else:
+            values = list(rng.permutation(vocabulary[f]))
+            weights = np.arange(1, len(values) + 1, dtype=np.float64) ** -exponent
+        picks = rng.choice(len(values), size=n_requests, p=weights / weights.sum())
+        columns[f] = [str(values[i]) for i in picks]
+    return [{f: columns[f][i] for f in FEATURE_COLUMNS} for i in range(n_requests)]
+
+
+def salary_frequencies(path):
+    """Value counts per SalaryInput field from salary.csv or an ingest.py cache."""
+    import ingest
+    frame = ingest.load_salary_data(path, columns=FEATURE_COLUMNS)
+    return {f: frame[f].astype(str).str.upper().value_counts().to_dict() for f in FEATURE_COLUMNS}
+
+
+def percentiles(samples_s):
+    samples_us = np.asarray(samples_s) * 1e6
+    return {
+        "mean_us": float(samples_us.mean()),
+        "p50_us": float(np.percentile(samples_us, 50)),
+        "p95_us": float(np.percentile(samples_us, 95)),
+        "p99_us": float(np.percentile(samples_us, 99)),
+    }
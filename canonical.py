@@ -0,0 +1,118 @@
+# canonical.py
+"""Canonical input values for the model, built once per model load.
+
+Every category the model knows is interned to an integer code (the compiled
+predictor's code when there is one). A request value is resolved, cheapest
+first, as:
+
+    exact      the value is already a known category
+    normalized after strip / upper-case / collapsing whitespace
+    alias      a known shorthand, e.g. "FULL-TIME" or "CRF" for
+               "CRF - CLASSIFIED REGULAR FULL-TIME", "F" for "FEMALE"
+
+Anything else is unknown: it is passed on as typed and reported back to the
+caller. Aliases are only kept when their target is in the model's vocabulary.
+"""
+import json
+
+# field -> alias -> canonical value
+ALIASES = {
+    "STATUS": {
+        "FULL-TIME": "CRF - CLASSIFIED REGULAR FULL-TIME",
+        "FULL TIME": "CRF - CLASSIFIED REGULAR FULL-TIME",
+        "PART-TIME": "CRP - CLASSIFIED REGULAR PART-TIME",
+        "PART TIME": "CRP - CLASSIFIED REGULAR PART-TIME",
+    },
+    "GENDER": {"M": "MALE", "F": "FEMALE"},
+    "ETHNICITY": {"AMERICAN INDIAN": "AM INDIAN", "NATIVE AMERICAN": "AM INDIAN"},
+}
+
+
+def normalize(value):
+    return " ".join(str(value).upper().split())
+
+
+def load_aliases(path):
+    """Extra aliases from a JSON file shaped like ALIASES."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Canonicalizer:
+    def __init__(self, vocabularies, aliases=None):
+        """vocabularies: field -> {category: code} or an ordered list of categories."""
+        self.fields = list(vocabularies)
+        self.codes = {}
+        self.values = {}
+        self.lookup = {}
+        for field in self.fields:
+            vocab = vocabularies[field]
+            codes = dict(vocab) if isinstance(vocab, dict) else {v: i for i, v in enumerate(vocab)}
+            self.codes[field] = codes
+            # Every spelling that resolves, mapped straight to (canonical value, code)
+            lookup = {}
+            for alias, target in self._aliases_for(field, codes, aliases).items():
+                lookup[alias] = (target, codes[target])
+            for value, code in codes.items():
+                lookup[normalize(value)] = (value, code)
+                lookup[value] = (value, code)
+            self.lookup[field] = lookup
+            self.values[field] = list(codes)
+
+    @staticmethod
+    def _aliases_for(field, codes, extra):
+        aliases = {}
+        for value in codes:
+            # "CRF - CLASSIFIED REGULAR FULL-TIME" is also "CRF" and "CLASSIFIED REGULAR FULL-TIME"
+            if " - " in value:
+                prefix, description = value.split(" - ", 1)
+                aliases.setdefault(normalize(prefix), value)
+                aliases.setdefault(normalize(description), value)
+        for source in (ALIASES, extra or {}):
+            for alias, target in source.get(field, {}).items():
+                if target in codes:
+                    aliases[normalize(alias)] = target
+        return aliases
+
+    def canonicalize(self, record):
+        """Resolve a record (dict or object with the fields).
+
+        Returns (values, codes, unknown): canonical value per field, a tuple of
+        codes (None for unknown fields) and the list of unknown fields.
+        """
+        get = record.get if isinstance(record, dict) else (lambda f: getattr(record, f))
+        values, codes, unknown = {}, [], []
+        for field in self.fields:
+            raw = get(field)
+            lookup = self.lookup[field]
+            hit = lookup.get(raw)
+            if hit is None and isinstance(raw, str):
+                hit = lookup.get(normalize(raw))
+            if hit is None:
+                values[field] = raw
+                codes.append(None)
+                unknown.append(field)
+            else:
+                values[field], code = hit
+                codes.append(code)
+        return values, tuple(codes), unknown
+
+    def canonicalize_column(self, field, values):
+        """Canonical values for one field; returns (values, positions of unknown values).
+
+        Each distinct value is resolved once; batches repeat values a lot.
+        """
+        lookup = self.lookup[field]
+        resolved, unknown_values = {}, set()
+        for raw in dict.fromkeys(values):
+            hit = lookup.get(raw)
+            if hit is None and isinstance(raw, str):
+                hit = lookup.get(normalize(raw))
+            if hit is None:
+                resolved[raw] = raw
+                unknown_values.add(raw)
+            else:
+                resolved[raw] = hit[0]
+        out = list(map(resolved.__getitem__, values))
+        unknown = [i for i, raw in enumerate(values) if raw in unknown_values] if unknown_values else []
+        return out, unknown
@@ -0,0 +1,829 @@
+# compiled_model.py
+"""Pandas-free inference for the model_simple.pkl pipeline.
+
+The fitted pipeline (column cleaner -> ColumnTransformer -> TransformedTargetRegressor
+wrapping a DecisionTreeRegressor) is folded into plain lookups once at startup
+by CompiledPredictor:
+
+* every known category of every input field is pushed through the fitted
+  preprocessing once, so encoders/imputers/scalers become a table lookup
+* the tree is flattened into node arrays, with the target inverse transform
+  (expm1) already applied to the leaf values
+
+Only numpy is needed to score; sklearn and pandas are imported lazily when
+compiling from a pipeline. save()/load() round-trip the compiled arrays through a
+single .npz file, which is the slim serving artifact written by export_model.py.
+
+set_leaf_intervals() optionally records, for every leaf, how many training rows
+landed there and quantiles of their (untransformed) targets. A prediction then
+comes with an observed interval for the price of one more array index.
+
+CompiledEnsemble does the same for the `train.py --model hgb` pipeline
+(HistGradientBoostingRegressor); compile_pipeline() and load_compiled() pick
+the right class.
+
+Parity check against the original pipeline:
+
+    python compiled_model.py model_simple.pkl
+"""
+import math
+import os
+import sys
+
+import numpy as np
+
+FEATURE_COLUMNS = ["AGENCY_NAME", "CLASS_TITLE", "ETHNICITY", "GENDER", "STATUS"]
+
+# Placeholder used to see how the pipeline treats categories it has never seen
+UNKNOWN_SENTINEL = "__UNKNOWN_CATEGORY__"
+# Leaf target quantiles recorded by set_leaf_intervals: an 80% interval and the median
+INTERVAL_QUANTILES = (0.1, 0.5, 0.9)
+# Upper bound on the cells of a CompiledEnsemble's tables (float64, so 32 MB)
+MAX_TABLE_CELLS = 4_000_000
+
+
+class CompiledPredictor:
+    def __init__(self, fields, vocabularies, columns, tables, unknown_ok, base,
+                 feature, threshold, children_left, children_right, leaf_value,
+                 source_checksum=None, leaf_counts=None, leaf_quantiles=None,
+                 interval_quantiles=INTERVAL_QUANTILES):
+        self.fields = list(fields)
+        # SHA-256 of the pickle this was compiled from, if known
+        self.source_checksum = source_checksum
+        # field -> {category: code}; code len(vocab) is the "unknown" row and
+        # len(vocab) + 1, when the table has it, the row for a missing (NaN) value
+        self.vocabularies = {f: {c: i for i, c in enumerate(vocabularies[f])} for f in self.fields}
+        self.columns = {f: np.asarray(columns[f], dtype=np.intp) for f in self.fields}
+        self.tables = {f: np.asarray(tables[f], dtype=np.float32) for f in self.fields}
+        # Artifacts from before the missing row treat NaN as unknown
+        self._missing_codes = {f: len(self.vocabularies[f]) + 1
+                               if len(self.tables[f]) == len(self.vocabularies[f]) + 2 else None
+                               for f in self.fields}
+        self.unknown_ok = dict(unknown_ok)
+        self.base = np.asarray(base, dtype=np.float32)
+
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.children_left = np.asarray(children_left, dtype=np.intp)
+        self.children_right = np.asarray(children_right, dtype=np.intp)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float64)
+
+        # Plain Python copies for the single-row path: list indexing is much
+        # cheaper than numpy scalar indexing
+        self._left_list = self.children_left.tolist()
+        self._right_list = self.children_right.tolist()
+        self._value_list = self.leaf_value.tolist()
+        self._build_decisions()
+        self._set_intervals(leaf_counts, leaf_quantiles, interval_quantiles)
+
+    def _build_decisions(self):
+        # Every feature belongs to one field, so a split only depends on that
+        # field's code: per inner node, one byte per code saying "go left".
+        # Scoring from codes then never builds the feature vector.
+        inner = np.flatnonzero(self.children_left != -1)
+        self._decision_field = [0] * len(self.children_left)
+        self._decisions = [b""] * len(self.children_left)
+        owned = np.zeros(len(inner), dtype=bool)
+        for j, f in enumerate(self.fields):
+            position = {int(col): k for k, col in enumerate(self.columns[f])}
+            nodes = [i for i, node in enumerate(inner) if int(self.feature[node]) in position]
+            if not nodes:
+                continue
+            ids = inner[nodes]
+            values = self.tables[f][:, [position[int(self.feature[node])] for node in ids]]
+            go_left = (values <= self.threshold[ids]).T.astype(np.uint8)
+            for node, row in zip(ids.tolist(), go_left):
+                self._decision_field[node] = j
+                self._decisions[node] = row.tobytes()
+            owned[nodes] = True
+        # Splits on a feature no field changes always go the same way
+        for node in inner[~owned].tolist():
+            go_left = self.base[self.feature[node]] <= self.threshold[node]
+            self._decisions[node] = bytes([go_left]) * (len(self.vocabularies[self.fields[0]]) + 2)
+
+    def _set_intervals(self, leaf_counts, leaf_quantiles, interval_quantiles):
+        # Per node: training rows in the leaf and their target quantiles (NaN for inner nodes)
+        self.interval_quantiles = tuple(float(q) for q in interval_quantiles)
+        self.leaf_counts = None if leaf_counts is None else np.asarray(leaf_counts, dtype=np.int32)
+        self.leaf_quantiles = None if leaf_quantiles is None else np.asarray(leaf_quantiles, dtype=np.float32)
+        self._count_list = None if leaf_counts is None else self.leaf_counts.tolist()
+        self._quantile_lists = None if leaf_quantiles is None else self.leaf_quantiles.astype(np.float64).tolist()
+
+    # ------------------------------------------------------------------ build
+    @classmethod
+    def from_pipeline(cls, model, vocabulary=None, fields=FEATURE_COLUMNS):
+        """Compile a fitted pipeline.
+
+        vocabulary optionally maps field -> iterable of categories; by default
+        the categories are read from the fitted encoders.
+        """
+        import pandas as pd
+
+        steps, target_transformer, tree = _split_pipeline(model)
+        if vocabulary is None:
+            vocabulary = _vocabulary_from_steps(steps)
+        vocabularies = {}
+        for f in fields:
+            if f not in vocabulary:
+                raise ValueError(f"No known categories for field {f}")
+            vocabularies[f] = sorted({str(v) for v in vocabulary[f]})
+
+        def transform(frame):
+            X = frame
+            for _, step in steps:
+                if step is None or step == "passthrough":
+                    continue
+                X = step.transform(X)
+            if hasattr(X, "toarray"):
+                X = X.toarray()
+            return np.asarray(X, dtype=np.float32)
+
+        baseline = {f: vocabularies[f][0] for f in fields}
+
+        def probe(field, values):
+            rows = {f: [baseline[f]] * len(values) for f in fields}
+            rows[field] = list(values)
+            return transform(pd.DataFrame(rows, columns=fields))
+
+        base = probe(fields[0], [baseline[fields[0]]])[0]
+        n_features = base.shape[0]
+        if tree.n_features_in_ != n_features:
+            raise ValueError("Preprocessing output does not match the tree's input width")
+
+        columns, tables, unknown_ok, owner = {}, {}, {}, {}
+        for f in fields:
+            known = probe(f, vocabularies[f])
+            try:
+                unknown = probe(f, [UNKNOWN_SENTINEL])
+                unknown_ok[f] = True
+            except Exception:
+                # Pipeline rejects unseen values; the compiled model will too
+                unknown = np.full((1, n_features), np.nan, dtype=np.float32)
+                unknown_ok[f] = False
+            try:
+                # NaN goes through the imputers, which needn't match an unknown value
+                missing = probe(f, [np.nan])
+            except Exception:
+                missing = None
+            table = np.vstack([known, unknown] + ([missing] if missing is not None else []))
+            compare = np.vstack([known] + ([unknown] if unknown_ok[f] else [])
+                                + ([missing] if missing is not None else []))
+            owned = np.flatnonzero((compare != compare[0]).any(axis=0))
+            for col in owned:
+                if col in owner:
+                    raise ValueError(
+                        f"Feature {col} depends on both {owner[col]} and {f}; "
+                        "only column-wise preprocessing can be compiled"
+                    )
+                owner[col] = f
+            columns[f] = owned
+            tables[f] = table[:, owned]
+
+        t = tree.tree_
+        is_leaf = t.children_left == -1
+        values = t.value[:, 0, 0].astype(np.float64)
+        if target_transformer is not None:
+            values = target_transformer.inverse_transform(values.reshape(-1, 1)).ravel()
+        feature = np.where(is_leaf, 0, t.feature)
+        threshold = np.where(is_leaf, 0.0, t.threshold)
+
+        return cls(fields, vocabularies, columns, tables, unknown_ok, base,
+                   feature, threshold, t.children_left, t.children_right, values)
+
+    # -------------------------------------------------------------- save/load
+    def save(self, path):
+        arrays = {
+            "fields": np.array(self.fields),
+            "unknown_ok": np.array([self.unknown_ok[f] for f in self.fields]),
+            "base": self.base,
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children_left": self.children_left,
+            "children_right": self.children_right,
+            "leaf_value": self.leaf_value,
+        }
+        for f in self.fields:
+            # dicts keep insertion order, which is the code order
+            arrays[f"vocab__{f}"] = np.array(list(self.vocabularies[f]), dtype=str)
+            arrays[f"columns__{f}"] = self.columns[f]
+            arrays[f"table__{f}"] = self.tables[f]
+        if self.source_checksum:
+            arrays["source_checksum"] = np.array(self.source_checksum)
+        if self.has_intervals:
+            arrays["leaf_counts"] = self.leaf_counts
+            arrays["leaf_quantiles"] = self.leaf_quantiles
+            arrays["interval_quantiles"] = np.array(self.interval_quantiles)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            fields = data["fields"].tolist()
+            return cls(
+                fields,
+                vocabularies={f: data[f"vocab__{f}"].tolist() for f in fields},
+                columns={f: data[f"columns__{f}"] for f in fields},
+                tables={f: data[f"table__{f}"] for f in fields},
+                unknown_ok=dict(zip(fields, data["unknown_ok"].tolist())),
+                base=data["base"],
+                feature=data["feature"],
+                threshold=data["threshold"],
+                children_left=data["children_left"],
+                children_right=data["children_right"],
+                leaf_value=data["leaf_value"],
+                source_checksum=str(data["source_checksum"]) if "source_checksum" in data.files else None,
+                leaf_counts=data["leaf_counts"] if "leaf_counts" in data.files else None,
+                leaf_quantiles=data["leaf_quantiles"] if "leaf_quantiles" in data.files else None,
+                interval_quantiles=(data["interval_quantiles"].tolist() if "interval_quantiles" in data.files
+                                    else INTERVAL_QUANTILES),
+            )
+
+    # ---------------------------------------------------------------- predict
+    def encode(self, field, value):
+        vocab = self.vocabularies[field]
+        code = vocab.get(value)
+        if code is None:
+            if self._missing_codes[field] is not None and _is_nan(value):
+                return self._missing_codes[field]
+            if not self.unknown_ok[field]:
+                raise ValueError(f"Unknown {field}: {value}")
+            code = len(vocab)
+        return code
+
+    def encode_column(self, field, values):
+        vocab = self.vocabularies[field]
+        unknown = len(vocab)
+        codes = np.fromiter((vocab.get(v, unknown) for v in values), dtype=np.intp, count=len(values))
+        if self._missing_codes[field] is not None and (codes == unknown).any():
+            missing = np.fromiter(map(_is_nan, values), dtype=bool, count=len(values))
+            codes[missing] = self._missing_codes[field]
+        if not self.unknown_ok[field] and (codes == unknown).any():
+            bad = values[int(np.argmax(codes == unknown))]
+            raise ValueError(f"Unknown {field}: {bad}")
+        return codes
+
+    def predict_one(self, record):
+        """Score a single record (dict or object with the input fields)."""
+        return self._value_list[self.leaf_one(record)]
+
+    def leaf_one(self, record):
+        """Node id of the leaf a single record lands in."""
+        get = record.get if isinstance(record, dict) else (lambda f: getattr(record, f))
+        return self.leaf_codes([self.encode(f, get(f)) for f in self.fields])
+
+    def predict_codes_one(self, codes):
+        """Score a single record already encoded as one code per field (None = unknown)."""
+        return self._value_list[self.leaf_codes(codes)]
+
+    def leaf_codes(self, codes):
+        if None in codes:
+            codes = list(codes)
+            for j, f in enumerate(self.fields):
+                if codes[j] is None:
+                    if not self.unknown_ok[f]:
+                        raise ValueError(f"Unknown {f}")
+                    codes[j] = len(self.vocabularies[f])
+
+        left, right = self._left_list, self._right_list
+        field, decisions = self._decision_field, self._decisions
+        node = 0
+        while left[node] != -1:
+            node = left[node] if decisions[node][codes[field[node]]] else right[node]
+        return node
+
+    @property
+    def has_intervals(self):
+        return self.leaf_counts is not None
+
+    @property
+    def summary(self):
+        return f"{len(self.leaf_value)} tree nodes"
+
+    def leaf_interval(self, node):
+        """Observed interval of a leaf: lower/upper quantile, median and support."""
+        if self._count_list is None or not self._count_list[node]:
+            return None
+        quantiles = self._quantile_lists[node]
+        interval = {
+            "lower": round(quantiles[0], 2),
+            "upper": round(quantiles[-1], 2),
+            "level": round(self.interval_quantiles[-1] - self.interval_quantiles[0], 6),
+        }
+        if 0.5 in self.interval_quantiles:
+            interval["median"] = round(quantiles[self.interval_quantiles.index(0.5)], 2)
+        interval["support"] = self._count_list[node]
+        return interval
+
+    def set_leaf_intervals(self, model, X, y, quantiles=INTERVAL_QUANTILES):
+        """Record per-leaf counts and target quantiles from training data.
+
+        model is the pipeline this predictor was compiled from, X/y its
+        training rows (y in the original, untransformed scale).
+        """
+        import pandas as pd
+
+        steps, _, tree = _split_pipeline(model)
+        Xt = X
+        for _, step in steps:
+            if step is None or step == "passthrough":
+                continue
+            Xt = step.transform(Xt)
+        if hasattr(Xt, "toarray"):
+            Xt = Xt.toarray()
+        leaves = tree.apply(np.asarray(Xt, dtype=np.float32))
+
+        n_nodes = len(self.leaf_value)
+        counts = np.bincount(leaves, minlength=n_nodes)
+        table = np.full((n_nodes, len(quantiles)), np.nan, dtype=np.float32)
+        by_leaf = pd.Series(np.asarray(y, dtype=np.float64)).groupby(leaves).quantile(list(quantiles)).unstack()
+        table[by_leaf.index.to_numpy()] = by_leaf.to_numpy()
+        self._set_intervals(counts, table, quantiles)
+
+    def predict_codes(self, codes):
+        """Vectorized scoring from a field -> code array mapping."""
+        n = len(codes[self.fields[0]])
+        X = np.tile(self.base, (n, 1))
+        for f in self.fields:
+            if len(self.columns[f]):
+                X[:, self.columns[f]] = self.tables[f][codes[f]]
+        return self.leaf_value[self._apply(X)]
+
+    def predict_columns(self, columns):
+        """Vectorized scoring from a field -> list of values mapping."""
+        return self.predict_codes({f: self.encode_column(f, columns[f]) for f in self.fields})
+
+    def predict_records(self, records):
+        return self.predict_columns({f: [r[f] for r in records] for f in self.fields})
+
+    def _apply(self, X):
+        # Walk all rows down the tree together, one level per iteration
+        rows = np.arange(X.shape[0])
+        node = np.zeros(X.shape[0], dtype=np.intp)
+        while True:
+            left = self.children_left[node]
+            active = left != -1
+            if not active.any():
+                return node
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(active, np.where(go_left, left, self.children_right[node]), node)
+
+
+class CompiledEnsemble:
+    """Pandas-free inference for a boosted ensemble (HistGradientBoostingRegressor).
+
+    Every input is categorical, so each tree is a function of the codes of the
+    fields it splits on. Trees splitting on the same set of fields are summed
+    into one dense table over those fields' codes once, at compile time:
+    scoring is at most 2**len(fields) - 1 table lookups whatever the number of
+    trees, and a batch is the same lookups as numpy fancy indexing.
+
+    Groups whose table would not fit in max_cells keep their trees, flattened
+    into node arrays with the split decisions precomputed per code, and are
+    walked instead (all trees of a batch together, one level per iteration).
+    """
+
+    has_intervals = False
+
+    def __init__(self, fields, vocabularies, unknown_ok, model_codes, groups, baseline, walk=None,
+                 inverse="expm1", n_trees=0, source_checksum=None):
+        self.fields = list(fields)
+        self.source_checksum = source_checksum
+        # field -> {category: code}; code len(vocab) is the "unknown" row
+        self.vocabularies = {f: {c: i for i, c in enumerate(vocabularies[f])} for f in self.fields}
+        self.unknown_ok = dict(unknown_ok)
+        # CategoryCodes maps NaN like an unknown value, so there's no separate missing row
+        self._missing_codes = {f: None for f in self.fields}
+        # field -> position on the field's table axis, per code
+        self.model_codes = {f: np.asarray(model_codes[f], dtype=np.intp) for f in self.fields}
+        # (field positions, table) per group of trees
+        self.groups = [(np.asarray(positions, dtype=np.intp), np.asarray(table, dtype=np.float64))
+                       for positions, table in groups]
+        # Walked trees: roots, per-node children (leaves point to themselves), field position,
+        # offset into decisions (go left?, per table axis position) and leaf value
+        walk = walk or _empty_walk()
+        self.walk = {name: np.asarray(walk[name], dtype=dtype) for name, dtype in _WALK_ARRAYS.items()}
+        self.walk_depth = int(walk["depth"])
+        self.baseline = float(baseline)
+        if inverse not in ("expm1", "identity"):
+            raise ValueError(f"Unsupported target inverse: {inverse}")
+        self.inverse = inverse
+        self.n_trees = int(n_trees)
+
+        # Single-row path: flat tables with per-field strides, everything else as lists
+        self._model_code_lists = [self.model_codes[f].tolist() for f in self.fields]
+        self._flat_groups = [(table.ravel(), list(zip(positions.tolist(), _strides(table.shape))))
+                             for positions, table in self.groups]
+        self._walk_lists = {name: values.tolist() for name, values in self.walk.items()}
+
+    @property
+    def summary(self):
+        cells = sum(table.size for _, table in self.groups)
+        walked = f", {len(self.walk['roots'])} walked" if len(self.walk["roots"]) else ""
+        return f"{self.n_trees} trees in {len(self.groups)} tables ({cells:,} cells){walked}"
+
+    # ------------------------------------------------------------------ build
+    @classmethod
+    def from_pipeline(cls, model, vocabulary=None, fields=FEATURE_COLUMNS, max_cells=MAX_TABLE_CELLS):
+        """Compile a fitted pipeline ending in a HistGradientBoostingRegressor.
+
+        max_cells bounds the total size of the tables; trees that don't fit
+        are walked. max_cells=0 walks every tree.
+        """
+        import pandas as pd
+
+        steps, target_transformer, booster = _split_pipeline(model)
+        if target_transformer is None:
+            inverse = "identity"
+        elif getattr(target_transformer, "inverse_func", None) is np.expm1:
+            inverse = "expm1"
+        else:
+            raise ValueError("Only a log1p/expm1 target transform can be compiled")
+        if vocabulary is None:
+            vocabulary = _vocabulary_from_steps(steps)
+        vocabularies = {}
+        for f in fields:
+            if f not in vocabulary:
+                raise ValueError(f"No known categories for field {f}")
+            vocabularies[f] = sorted({str(v) for v in vocabulary[f]})
+
+        def transform(frame):
+            X = frame
+            for _, step in steps:
+                if step is None or step == "passthrough":
+                    continue
+                X = step.transform(X)
+            return np.asarray(X, dtype=np.float64)
+
+        baseline = {f: vocabularies[f][0] for f in fields}
+
+        def probe(field, values):
+            rows = {f: [baseline[f]] * len(values) for f in fields}
+            rows[field] = list(values)
+            return transform(pd.DataFrame(rows, columns=fields))
+
+        base = probe(fields[0], [baseline[fields[0]]])[0]
+        if booster.n_features_in_ != base.shape[0]:
+            raise ValueError("Preprocessing output does not match the booster's input width")
+
+        # Per field: the distinct model inputs it produces, one table axis position each
+        owner, columns, inputs, model_codes, unknown_ok = {}, {}, {}, {}, {}
+        for j, f in enumerate(fields):
+            known = probe(f, vocabularies[f])
+            try:
+                unknown = probe(f, [UNKNOWN_SENTINEL])
+                unknown_ok[f] = True
+            except Exception:
+                unknown = None
+                unknown_ok[f] = False
+            table = known if unknown is None else np.vstack([known, unknown])
+            owned = np.flatnonzero((table != table[0]).any(axis=0))
+            for col in owned:
+                if col in owner:
+                    raise ValueError(
+                        f"Feature {col} depends on both {fields[owner[col]]} and {f}; "
+                        "only column-wise preprocessing can be compiled"
+                    )
+                owner[col] = j
+            rows = table[:, owned]
+            # Compared as bytes so NaN (unknown/missing) matches itself
+            distinct, first, codes = {}, [], []
+            for i, row in enumerate(rows):
+                key = row.tobytes()
+                if key not in distinct:
+                    distinct[key] = len(first)
+                    first.append(i)
+                codes.append(distinct[key])
+            if unknown is None:
+                codes.append(0)  # never used, encode() raises first
+            columns[f], inputs[f], model_codes[f] = owned, rows[first], codes
+
+        by_fields = {}
+        for predictors in booster._predictors:
+            if len(predictors) != 1:
+                raise ValueError("Only single-output boosters can be compiled")
+            tree = predictors[0]
+            split = tree.nodes["is_leaf"] == 0
+            used = tuple(sorted({owner[int(c)] for c in tree.nodes["feature_idx"][split]}))
+            by_fields.setdefault(used, []).append(tree)
+
+        # Tabulate the groups that buy the most trees per cell, walk the rest
+        shapes = {used: tuple(len(inputs[fields[j]]) for j in used) for used in by_fields}
+        tabulated, walked, budget = [], [], max_cells
+        for used in sorted(by_fields, key=lambda u: np.prod(shapes[u]) / len(by_fields[u])):
+            cells = int(np.prod(shapes[used]))
+            if not used or cells <= budget:
+                tabulated.append(used)
+                budget -= cells if used else 0
+            else:
+                walked.extend(by_fields[used])
+
+        known_bitsets, f_idx_map = booster._bin_mapper.make_known_categories_bitsets()
+        groups, constant = [], 0.0
+        for used in tabulated:
+            shape = shapes[used]
+            # One model input row per combination of the group's fields
+            grid = np.indices(shape).reshape(len(shape), int(np.prod(shape)))
+            X = np.tile(base, (grid.shape[1], 1))
+            for axis, j in enumerate(used):
+                f = fields[j]
+                X[:, columns[f]] = inputs[f][grid[axis]]
+            total = np.zeros(grid.shape[1])
+            for tree in by_fields[used]:
+                total += tree.predict(X, known_bitsets, f_idx_map, n_threads=os.cpu_count() or 1)
+            if used:
+                groups.append((used, total.reshape(shape)))
+            else:
+                constant += float(total[0])
+        baseline_value = float(np.ravel(booster._baseline_prediction)[0]) + constant
+
+        walk = _flatten_trees(walked, fields, owner, columns, inputs, known_bitsets, f_idx_map)
+        return cls(fields, vocabularies, unknown_ok, model_codes, groups, baseline_value, walk=walk,
+                   inverse=inverse, n_trees=len(booster._predictors))
+
+    # -------------------------------------------------------------- save/load
+    def save(self, path):
+        arrays = {
+            "kind": np.array("ensemble"),
+            "fields": np.array(self.fields),
+            "unknown_ok": np.array([self.unknown_ok[f] for f in self.fields]),
+            "baseline": np.array(self.baseline),
+            "inverse": np.array(self.inverse),
+            "n_trees": np.array(self.n_trees),
+            "n_groups": np.array(len(self.groups)),
+            "walk__depth": np.array(self.walk_depth),
+        }
+        for f in self.fields:
+            arrays[f"vocab__{f}"] = np.array(list(self.vocabularies[f]), dtype=str)
+            arrays[f"model_codes__{f}"] = self.model_codes[f]
+        for i, (positions, table) in enumerate(self.groups):
+            arrays[f"group_fields__{i}"] = positions
+            arrays[f"group_table__{i}"] = table
+        for name, values in self.walk.items():
+            arrays[f"walk__{name}"] = values
+        if self.source_checksum:
+            arrays["source_checksum"] = np.array(self.source_checksum)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            fields = data["fields"].tolist()
+            walk = {name: data[f"walk__{name}"] for name in _WALK_ARRAYS}
+            walk["depth"] = int(data["walk__depth"])
+            return cls(
+                fields,
+                vocabularies={f: data[f"vocab__{f}"].tolist() for f in fields},
+                unknown_ok=dict(zip(fields, data["unknown_ok"].tolist())),
+                model_codes={f: data[f"model_codes__{f}"] for f in fields},
+                groups=[(data[f"group_fields__{i}"], data[f"group_table__{i}"])
+                        for i in range(int(data["n_groups"]))],
+                baseline=float(data["baseline"]),
+                walk=walk,
+                inverse=str(data["inverse"]),
+                n_trees=int(data["n_trees"]),
+                source_checksum=str(data["source_checksum"]) if "source_checksum" in data.files else None,
+            )
+
+    # ---------------------------------------------------------------- predict
+    # Same encoding rules as the tree
+    encode = CompiledPredictor.encode
+    encode_column = CompiledPredictor.encode_column
+
+    def predict_one(self, record):
+        """Score a single record (dict or object with the input fields)."""
+        get = record.get if isinstance(record, dict) else (lambda f: getattr(record, f))
+        return self.predict_codes_one([self.encode(f, get(f)) for f in self.fields])
+
+    def predict_codes_one(self, codes):
+        """Score a single record already encoded as one code per field (None = unknown)."""
+        index = []
+        for f, code, model_codes in zip(self.fields, codes, self._model_code_lists):
+            if code is None:
+                if not self.unknown_ok[f]:
+                    raise ValueError(f"Unknown {f}")
+                code = len(self.vocabularies[f])
+            index.append(model_codes[code])
+        raw = self.baseline
+        for table, strides in self._flat_groups:
+            raw += table[sum(index[j] * stride for j, stride in strides)]
+
+        walk = self._walk_lists
+        left, right, field, offset, decisions = (walk["left"], walk["right"], walk["field"],
+                                                 walk["offset"], walk["decisions"])
+        for node in walk["roots"]:
+            while left[node] != node:
+                node = left[node] if decisions[offset[node] + index[field[node]]] else right[node]
+            raw += walk["value"][node]
+        return math.expm1(raw) if self.inverse == "expm1" else float(raw)
+
+    def predict_codes(self, codes):
+        """Vectorized scoring from a field -> code array mapping."""
+        index = [self.model_codes[f][codes[f]] for f in self.fields]
+        raw = np.full(len(index[0]), self.baseline)
+        for positions, table in self.groups:
+            raw += table[tuple(index[j] for j in positions)]
+        if len(self.walk["roots"]):
+            raw += self._walk_trees(np.stack(index, axis=1))
+        return np.expm1(raw) if self.inverse == "expm1" else raw
+
+    def predict_columns(self, columns):
+        """Vectorized scoring from a field -> list of values mapping."""
+        return self.predict_codes({f: self.encode_column(f, columns[f]) for f in self.fields})
+
+    def predict_records(self, records):
+        return self.predict_columns({f: [r[f] for r in records] for f in self.fields})
+
+    def _walk_trees(self, index):
+        # Every (row, tree) pair moves down one level per iteration; leaves loop on themselves
+        w = self.walk
+        rows = np.arange(index.shape[0])[:, None]
+        node = np.tile(w["roots"], (index.shape[0], 1))
+        for _ in range(self.walk_depth):
+            go_left = w["decisions"][w["offset"][node] + index[rows, w["field"][node]]]
+            node = np.where(go_left, w["left"][node], w["right"][node])
+        return w["value"][node].sum(axis=1)
+
+
+def _is_nan(value):
+    # NaN only: None is an unknown category to the pipelines, like any other value
+    return isinstance(value, float) and value != value
+
+
+_WALK_ARRAYS = {"roots": np.intp, "left": np.intp, "right": np.intp, "field": np.intp,
+                "offset": np.intp, "value": np.float64, "decisions": np.bool_}
+
+
+def _empty_walk():
+    walk = {name: np.zeros(0, dtype=dtype) for name, dtype in _WALK_ARRAYS.items()}
+    walk["depth"] = 0
+    return walk
+
+
+def _flatten_trees(trees, fields, owner, columns, inputs, known_bitsets, f_idx_map):
+    """Node arrays for CompiledEnsemble's walked trees.
+
+    Each split gets its decision for every table axis position of its field,
+    following HistGradientBoostingRegressor's rules for raw inputs: NaN and
+    negative categories are missing, categories outside the training set go
+    where missing values go.
+    """
+    walk = _empty_walk()
+    if not trees:
+        return walk
+    roots, left, right, field, offset, value, decisions = [], [], [], [], [], [], []
+    size, depth = 0, 0
+    for tree in trees:
+        nodes, start = tree.nodes, len(left)
+        roots.append(start)
+        depth = max(depth, int(nodes["depth"].max()))
+        for i, node in enumerate(nodes):
+            if node["is_leaf"]:
+                left.append(start + i)
+                right.append(start + i)
+                field.append(0)
+                offset.append(0)
+                value.append(float(node["value"]))
+                continue
+            feature = int(node["feature_idx"])
+            j = owner[feature]
+            x = inputs[fields[j]][:, list(columns[fields[j]]).index(feature)]
+            missing = np.isnan(x)
+            if node["is_categorical"]:
+                missing |= x < 0
+                category = np.where(missing, 0, x).astype(np.intp) & 0xFF
+                go_left = np.where(
+                    _in_bitset(tree.raw_left_cat_bitsets[node["bitset_idx"]], category), True,
+                    np.where(_in_bitset(known_bitsets[f_idx_map[feature]], category), False,
+                             bool(node["missing_go_to_left"])))
+            else:
+                go_left = x <= node["num_threshold"]
+            go_left = np.where(missing, bool(node["missing_go_to_left"]), go_left)
+            left.append(start + int(node["left"]))
+            right.append(start + int(node["right"]))
+            field.append(j)
+            offset.append(size)
+            value.append(0.0)
+            decisions.append(go_left)
+            size += len(go_left)
+    walk.update(roots=roots, left=left, right=right, field=field, offset=offset, value=value,
+                decisions=np.concatenate(decisions) if decisions else np.zeros(0, dtype=bool), depth=depth)
+    return walk
+
+
+def _in_bitset(bitset, values):
+    return ((bitset[values >> 5] >> (values & 31).astype(np.uint32)) & 1).astype(bool)
+
+
+def _strides(shape):
+    # Row-major element strides of a table
+    strides, step = [], 1
+    for size in reversed(shape):
+        strides.append(step)
+        step *= size
+    return strides[::-1]
+
+
+def _split_pipeline(model):
+    """Return (preprocessing steps, target transformer, fitted tree)."""
+    steps, target_transformer, est = [], None, model
+    while True:
+        if hasattr(est, "steps"):
+            steps.extend(est.steps[:-1])
+            est = est.steps[-1][1]
+        elif hasattr(est, "regressor_") and hasattr(est, "transformer_"):
+            if target_transformer is not None:
+                raise ValueError("Nested target transformers are not supported")
+            target_transformer = est.transformer_
+            est = est.regressor_
+        else:
+            break
+    if not hasattr(est, "tree_") and not hasattr(est, "_predictors"):
+        raise TypeError(f"Cannot compile {type(est).__name__}; expected a fitted DecisionTreeRegressor "
+                        "or HistGradientBoostingRegressor")
+    return steps, target_transformer, est
+
+
+def compile_pipeline(model, **kwargs):
+    """CompiledPredictor for a tree pipeline, CompiledEnsemble for a boosted one."""
+    _, _, est = _split_pipeline(model)
+    if hasattr(est, "_predictors"):
+        return CompiledEnsemble.from_pipeline(model, **kwargs)
+    return CompiledPredictor.from_pipeline(model, **kwargs)
+
+
+def load_compiled(path):
+    """Load a .npz artifact written by either compiled class."""
+    with np.load(path, allow_pickle=False) as data:
+        kind = str(data["kind"]) if "kind" in data.files else "tree"
+    return CompiledEnsemble.load(path) if kind == "ensemble" else CompiledPredictor.load(path)
+
+
+def extract_vocabulary(model):
+    """Known categories per column, read from the fitted encoders of a pipeline."""
+    steps, _, _ = _split_pipeline(model)
+    return {column: sorted(values) for column, values in _vocabulary_from_steps(steps).items()}
+
+
+def _vocabulary_from_steps(steps):
+    """Collect known categories per column from fitted encoders in a ColumnTransformer."""
+    vocabulary = {}
+    for _, step in steps:
+        if hasattr(step, "categories_") and hasattr(step, "feature_names_in_"):
+            # A single encoder over all the columns (CategoryCodes)
+            for col, cats in zip(step.feature_names_in_, step.categories_):
+                vocabulary.setdefault(col, set()).update(c for c in cats if isinstance(c, str))
+        for _, transformer, cols in getattr(step, "transformers_", []):
+            if not isinstance(cols, (list, tuple)) and not hasattr(cols, "tolist"):
+                continue
+            cols = list(cols)
+            inner = [s for _, s in transformer.steps] if hasattr(transformer, "steps") else [transformer]
+            for est in inner:
+                if hasattr(est, "categories_"):
+                    for col, cats in zip(cols, est.categories_):
+                        vocabulary.setdefault(col, set()).update(c for c in cats if isinstance(c, str))
+                mapping = getattr(est, "mapping", None)
+                if isinstance(mapping, dict):
+                    for key, counts in mapping.items():
+                        col = cols[key] if isinstance(key, int) else key
+                        index = getattr(counts, "index", [])
+                        vocabulary.setdefault(col, set()).update(c for c in index if isinstance(c, str))
+    return vocabulary
+
+
+def check_parity(model, compiled, n_rows=20000, seed=0):
+    """Compare compiled predictions with model.predict on the training categories.
+
+    Every known category of every field appears at least once; the remaining
+    fields of each row are drawn at random. Returns the max absolute difference.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    vocab = {f: list(compiled.vocabularies[f]) for f in compiled.fields}
+    n_rows = max(n_rows, max(len(v) for v in vocab.values()))
+    frame = {}
+    for f in compiled.fields:
+        values = np.array(vocab[f], dtype=object)
+        column = values[rng.integers(0, len(values), n_rows)]
+        column[:len(values)] = values
+        frame[f] = column.tolist()
+    frame = pd.DataFrame(frame, columns=compiled.fields)
+
+    expected = np.asarray(model.predict(frame), dtype=np.float64)
+    vectorized = compiled.predict_columns({f: frame[f].tolist() for f in compiled.fields})
+    single = np.array([compiled.predict_one(r) for r in frame.head(2000).to_dict("records")])
+    return max(float(np.max(np.abs(expected - vectorized))),
+               float(np.max(np.abs(expected[:len(single)] - single))))
+
+
+if __name__ == "__main__":
+    import joblib
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "model_simple.pkl"
+    model = joblib.load(path)
+    compiled = compile_pipeline(model)
+    diff = check_parity(model, compiled)
+    sizes = ", ".join(f"{f}={len(v)}" for f, v in compiled.vocabularies.items())
+    print(f"Compiled {path}: {compiled.summary}, categories {sizes}")
+    print(f"Max abs difference vs model.predict: {diff:.6g}")
+    sys.exit(0 if diff <= 1e-6 else 1)
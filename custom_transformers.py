@@ -0,0 +1,60 @@
+# custom_transformers.py
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+class ColumnNameCleaner(BaseEstimator, TransformerMixin):
+    """Normalize column names: 'AGENCY NAME' -> 'AGENCY_NAME'.
+
+    Lets the pipeline accept both the raw salary.csv headers and the
+    SalaryInput field names used by the API.
+    """
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        X = X.copy()
+        X.columns = [str(c).strip().upper().replace(" ", "_") for c in X.columns]
+        return X
+
+
+class CategoryCodes(BaseEstimator, TransformerMixin):
+    """Integer category codes for HistGradientBoostingRegressor's native categorical support.
+
+    The booster takes at most max_bins (255) categories per feature, and
+    CLASS_TITLE has more. The most frequent max_categories - 1 values of a
+    column keep their own code; rarer values share the last one. Unseen and
+    missing values become NaN, which the booster routes like missing data.
+    """
+
+    def __init__(self, max_categories=255):
+        self.max_categories = max_categories
+
+    def fit(self, X, y=None):
+        self.feature_names_in_ = np.asarray([str(c) for c in X.columns], dtype=object)
+        self.categories_, self.codes_ = [], []
+        for column in X.columns:
+            counts = X[column].value_counts()
+            counts = counts[counts > 0]
+            # Most frequent first, ties by value, so refits give the same codes
+            order = sorted(counts.index, key=lambda v: (-counts[v], str(v)))
+            kept = order if len(order) <= self.max_categories else order[:self.max_categories - 1]
+            codes = {v: i for i, v in enumerate(kept)}
+            codes.update({v: len(kept) for v in order[len(kept):]})
+            self.categories_.append(sorted(order, key=str))
+            self.codes_.append(codes)
+        return self
+
+    def transform(self, X):
+        out = np.empty((len(X), len(self.codes_)), dtype=np.float64)
+        for j, (column, codes) in enumerate(zip(self.feature_names_in_, self.codes_)):
+            values = X[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # One lookup per category instead of per row; code -1 (missing) hits the trailing NaN
+                lookup = np.array([codes.get(c, np.nan) for c in values.cat.categories] + [np.nan])
+                out[:, j] = lookup[values.cat.codes.to_numpy()]
+            else:
+                out[:, j] = values.map(codes).to_numpy(dtype=np.float64, na_value=np.nan)
+        return out
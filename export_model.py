@@ -0,0 +1,63 @@
+# export_model.py
+"""Export model_simple.pkl to the slim serving artifact.
+
+    python export_model.py model_simple.pkl model_simple.npz
+    python export_model.py model_simple.pkl model_simple.npz --data salary.csv
+
+The artifact holds only numpy arrays and category lists (see compiled_model.py),
+so serving it with SALARY_MODEL_PATH=model_simple.npz never imports sklearn,
+pandas or category_encoders. The export is checked against model.predict
+before it is written.
+
+With --data the training rows are run through the tree once and every leaf's
+row count and target quantiles are stored too, so /predict can return an
+observed interval instead of a bare point estimate. Boosted ensembles
+(`train.py --model hgb`) have no single leaf per prediction and export without.
+"""
+import argparse
+
+import joblib
+
+from compiled_model import INTERVAL_QUANTILES, check_parity, compile_pipeline, load_compiled
+from lookup_table import file_checksum
+
+
+def export(model_path, artifact_path, tolerance=1e-6, data=None, quantiles=INTERVAL_QUANTILES):
+    """data: salary.csv / ingest cache path or an (X, y) tuple for leaf intervals.
+
+    A path is split like train.py does and only its training part is used; an
+    (X, y) tuple should be the rows the model was fitted on.
+    """
+    model = joblib.load(model_path)
+    compiled = compile_pipeline(model)
+    compiled.source_checksum = file_checksum(model_path)
+    if data is not None and hasattr(compiled, "set_leaf_intervals"):
+        if isinstance(data, str):
+            from train import load_training_data, split
+            X_train, _, y_train, _ = split(*load_training_data(data))
+            data = (X_train, y_train)
+        compiled.set_leaf_intervals(model, *data, quantiles=quantiles)
+
+    diff = check_parity(model, compiled)
+    if diff > tolerance:
+        raise ValueError(f"Compiled model differs from the pipeline by {diff:.6g}")
+
+    compiled.save(artifact_path)
+    # Round-trip to make sure what we wrote is what we checked
+    reloaded = load_compiled(artifact_path)
+    diff = check_parity(model, reloaded)
+    if diff > tolerance:
+        raise ValueError(f"Saved artifact differs from the pipeline by {diff:.6g}")
+    return reloaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the slim .npz serving artifact")
+    parser.add_argument("model", help="model_simple.pkl")
+    parser.add_argument("artifact", help="output .npz")
+    parser.add_argument("--data", help="salary.csv or an ingest.py cache, to record leaf intervals")
+    args = parser.parse_args()
+    compiled = export(args.model, args.artifact, data=args.data)
+    intervals = ", with leaf intervals" if compiled.has_intervals else ""
+    print(f"Wrote {args.artifact}: {compiled.summary}{intervals}, "
+          f"source model {compiled.source_checksum[:12]}")
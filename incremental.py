@@ -0,0 +1,245 @@
+# incremental.py
+"""Incremental retraining from appended salary snapshots.
+
+    python train.py snapshot.csv model_simple.pkl --incremental train_state.npz [--export model_simple.npz]
+    python incremental.py salary.csv --chunks 4      # check against a full refit
+
+Every row the model sees is one of a limited set of category combinations, and
+with the default squared-error criterion a DecisionTreeRegressor only looks at
+per-node sums of the (log) target. So instead of the rows, TrainingStats keeps
+
+    per column  running value counts (the CountEncoder frequencies, the imputer modes)
+    per cell    n, sum and sum of squares of log1p(target) for each combination
+
+and updating it costs time proportional to the new rows. fit() rebuilds the
+usual train.build_pipeline() from those statistics: the encoders get the exact
+counts and the tree is fit on one weighted row per cell, with min_samples_leaf
+turned into the equivalent minimum weight. Predictions match a full refit up to
+floating point; ties between equally good splits may break differently.
+
+Leaf intervals need the raw salaries, so artifacts exported from here have none.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from compiled_model import FEATURE_COLUMNS
+from custom_transformers import ColumnNameCleaner
+from lookup_table import file_checksum
+
+
+class TrainingStats:
+    def __init__(self, columns=FEATURE_COLUMNS):
+        self.columns = list(columns)
+        # column -> list of values; codes index into it
+        self.vocabularies = {c: [] for c in self.columns}
+        self._codes = {c: {} for c in self.columns}
+        # column -> counts aligned with the vocabulary, plus missing values per column
+        self.counts = {c: np.zeros(0, dtype=np.int64) for c in self.columns}
+        self.missing = {c: 0 for c in self.columns}
+        # One row per category combination seen, code -1 for a missing value
+        self.cell_codes = np.zeros((0, len(self.columns)), dtype=np.int32)
+        self.cell_n = np.zeros(0, dtype=np.int64)
+        self.cell_sum = np.zeros(0, dtype=np.float64)
+        self.cell_sumsq = np.zeros(0, dtype=np.float64)
+        # Checksums of the snapshots already applied
+        self.sources = []
+
+    @property
+    def rows(self):
+        return int(self.cell_n.sum())
+
+    def __len__(self):
+        return len(self.cell_n)
+
+    def _encode(self, column, values):
+        """Codes for a column, growing the vocabulary; -1 for missing values."""
+        codes, vocab = self._codes[column], self.vocabularies[column]
+        for value in pd.unique(values[pd.notna(values)]):
+            if value not in codes:
+                codes[value] = len(vocab)
+                vocab.append(value)
+        out = np.full(len(values), -1, dtype=np.int32)
+        present = pd.notna(values)
+        out[present] = [codes[v] for v in values[present]]
+        return out
+
+    def update(self, X, y, source=None):
+        """Add rows (raw or cleaned column names); returns the number of rows added."""
+        if source is not None:
+            if source in self.sources:
+                raise ValueError(f"Snapshot {source[:12]} was already applied")
+            self.sources.append(source)
+        X = ColumnNameCleaner().transform(X)
+        y = np.log1p(np.asarray(y, dtype=np.float64))
+        keep = ~np.isnan(y)
+        codes = np.empty((int(keep.sum()), len(self.columns)), dtype=np.int32)
+        for j, column in enumerate(self.columns):
+            values = np.asarray(X[column].astype(object))[keep]
+            codes[:, j] = self._encode(column, values)
+            present = codes[:, j] >= 0
+            counts = np.bincount(codes[present, j], minlength=len(self.vocabularies[column]))
+            self.counts[column] = np.pad(self.counts[column], (0, len(counts) - len(self.counts[column]))) + counts
+            self.missing[column] += int((~present).sum())
+        y = y[keep]
+
+        # Group the new rows by cell, then merge with the cells already known
+        all_codes = np.concatenate([self.cell_codes, codes])
+        cells, inverse = np.unique(all_codes, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        old, new = inverse[:len(self.cell_codes)], inverse[len(self.cell_codes):]
+        n = np.zeros(len(cells), dtype=np.int64)
+        total, total_sq = np.zeros(len(cells)), np.zeros(len(cells))
+        n[old], total[old], total_sq[old] = self.cell_n, self.cell_sum, self.cell_sumsq
+        n += np.bincount(new, minlength=len(cells))
+        total += np.bincount(new, weights=y, minlength=len(cells))
+        total_sq += np.bincount(new, weights=y * y, minlength=len(cells))
+        self.cell_codes, self.cell_n, self.cell_sum, self.cell_sumsq = cells, n, total, total_sq
+        return len(y)
+
+    def value_counts(self, column):
+        """Counts after most-frequent imputation, like the fitted imputer + CountEncoder see them."""
+        counts = pd.Series(self.counts[column], index=self.vocabularies[column], dtype=np.int64)
+        counts = counts[counts > 0]
+        if self.missing[column]:
+            counts[self.mode(column)] += self.missing[column]
+        return counts
+
+    def mode(self, column):
+        # SimpleImputer(strategy="most_frequent") keeps the smallest value among ties
+        counts = pd.Series(self.counts[column], index=self.vocabularies[column])
+        return min(counts.index[counts == counts.max()])
+
+    def cell_frame(self):
+        """One row per cell with the original values (NaN for missing)."""
+        columns = {}
+        for j, column in enumerate(self.columns):
+            vocab = np.array(self.vocabularies[column] + [np.nan], dtype=object)
+            columns[column] = vocab[self.cell_codes[:, j]]
+        return pd.DataFrame(columns)
+
+    def fit(self, params=None, random_state=42):
+        """Fitted train.build_pipeline() equivalent to fitting on every row added so far."""
+        from train import DEFAULT_PARAMS, build_pipeline
+
+        params = {**DEFAULT_PARAMS, **(params or {})}
+        min_samples_leaf = params.pop("min_samples_leaf", 1)
+        rows = self.rows
+        if isinstance(min_samples_leaf, float):
+            min_samples_leaf = int(np.ceil(min_samples_leaf * rows))
+        # Each cell is one weighted sample: "at least k rows per leaf" becomes a
+        # minimum leaf weight (k - 0.5 so float rounding can't reject exactly k)
+        params.update(min_samples_leaf=1, min_weight_fraction_leaf=min(max(min_samples_leaf - 0.5, 0) / rows, 0.5))
+        pipeline = build_pipeline(params, random_state=random_state)
+
+        cells = self.cell_frame()
+        cleaner = pipeline.named_steps["cleaner"].fit(cells)
+        cells = cleaner.transform(cells)
+        preprocessor = pipeline.named_steps["preprocessor"].fit(cells)
+        self._set_encoder_counts(preprocessor, cells)
+
+        X = preprocessor.transform(cells)
+        mean = self.cell_sum / self.cell_n
+        # TransformedTargetRegressor applies log1p again, so hand it the cell means back in salary space
+        pipeline.named_steps["model"].fit(X, np.expm1(mean), sample_weight=self.cell_n.astype(np.float64))
+        return pipeline
+
+    def _set_encoder_counts(self, preprocessor, cells):
+        # The transformers were fit on one row per cell; give them the row counts
+        for _, transformer, columns in preprocessor.transformers_:
+            if not hasattr(transformer, "named_steps"):
+                continue
+            imputer = transformer.named_steps.get("imputer")
+            if imputer is not None:
+                imputer.statistics_ = np.array([self.mode(c) for c in columns], dtype=object)
+            encoder = transformer.named_steps.get("encoder")
+            if isinstance(getattr(encoder, "mapping", None), dict):
+                for key, column in zip(encoder.cols, columns):
+                    counts = self.value_counts(column)
+                    encoder.mapping[key] = (counts / counts.sum()).rename("proportion")
+                # Every category occurs in some cell, so the cells span the same range as the rows
+                imputed = imputer.transform(cells[columns]) if imputer is not None else cells[columns]
+                transformer.named_steps["scaler"].fit(encoder.transform(imputed))
+
+    def save(self, path):
+        arrays = {
+            "columns": np.array(self.columns),
+            "missing": np.array([self.missing[c] for c in self.columns], dtype=np.int64),
+            "cell_codes": self.cell_codes,
+            "cell_n": self.cell_n,
+            "cell_sum": self.cell_sum,
+            "cell_sumsq": self.cell_sumsq,
+            "sources": np.array(self.sources, dtype=str),
+        }
+        for c in self.columns:
+            arrays[f"vocab__{c}"] = np.array(self.vocabularies[c], dtype=str)
+            arrays[f"counts__{c}"] = self.counts[c]
+        # Write next to the target and swap, so a crash never leaves half a state file
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            stats = cls(data["columns"].tolist())
+            for j, c in enumerate(stats.columns):
+                stats.vocabularies[c] = data[f"vocab__{c}"].tolist()
+                stats._codes[c] = {v: i for i, v in enumerate(stats.vocabularies[c])}
+                stats.counts[c] = data[f"counts__{c}"]
+                stats.missing[c] = int(data["missing"][j])
+            stats.cell_codes = data["cell_codes"]
+            stats.cell_n = data["cell_n"]
+            stats.cell_sum = data["cell_sum"]
+            stats.cell_sumsq = data["cell_sumsq"]
+            stats.sources = data["sources"].tolist()
+        return stats
+
+
+def snapshot_checksum(path):
+    # ingest.py caches are directories; their meta.json identifies the source file
+    return file_checksum(path if os.path.isfile(path) else os.path.join(path, "meta.json"))
+
+
+def compare(data_path, chunks=4, params=None):
+    """Apply data_path in chunks and compare with a full refit; returns the max relative difference."""
+    from train import build_pipeline, load_training_data
+
+    X, y = load_training_data(data_path)
+    stats = TrainingStats()
+    bounds = np.linspace(0, len(X), chunks + 1).astype(int)
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        started = time.perf_counter()
+        stats.update(X.iloc[start:stop], y[start:stop])
+        print(f"  + {stop - start:,} rows -> {len(stats):,} cells in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    incremental = stats.fit(params)
+    print(f"Incremental fit on {len(stats):,} cells: {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    full = build_pipeline(params).fit(X, y)
+    print(f"Full refit on {len(X):,} rows: {time.perf_counter() - started:.2f}s")
+
+    a, b = incremental.predict(X), full.predict(X)
+    diff = np.abs(a - b) / np.maximum(np.abs(b), 1.0)
+    trees = [m.named_steps["model"].regressor_.tree_ for m in (incremental, full)]
+    print(f"Tree leaves: incremental {trees[0].n_leaves:,}, full {trees[1].n_leaves:,}")
+    print(f"Rows with the same prediction: {(diff < 1e-9).mean():.4%}, max relative difference {diff.max():.3g}")
+    return float(diff.max())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check incremental training against a full refit")
+    parser.add_argument("data", nargs="?", default="salary.csv", help="salary.csv or an ingest.py cache directory")
+    parser.add_argument("--chunks", type=int, default=4, help="number of snapshots to split the data into")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args()
+    worst = compare(args.data, args.chunks)
+    if worst > args.tolerance:
+        print(f"❌ Incremental model differs from the full refit (max {worst:.3g})")
+        sys.exit(1)
+    print("✅ Incremental model matches the full refit")
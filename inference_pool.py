@@ -0,0 +1,103 @@
+# inference_pool.py
+"""Bounded executor that keeps CPU-bound inference off the event loop.
+
+Requests beyond `workers + max_queue` in flight are rejected straight away
+with PoolOverloaded instead of queueing without limit.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class PoolOverloaded(Exception):
+    pass
+
+
+def _timed_call(fn, args):
+    # Runs in the worker: report when the task actually started
+    return time.monotonic(), fn(*args)
+
+
+class InferencePool:
+    def __init__(self, kind="thread", workers=None, max_queue=256, window=1000):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 4
+        self.max_queue = max_queue
+        self._executor = self._make_executor()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waits = deque(maxlen=window)
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.max_wait = 0.0
+
+    def _make_executor(self):
+        if self.kind == "process":
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+    @property
+    def queue_depth(self):
+        return max(0, self._in_flight - self.workers)
+
+    async def submit(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolOverloaded(f"{self._in_flight} requests in flight")
+            self._in_flight += 1
+
+        enqueued = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            started, result = await loop.run_in_executor(self._executor, _timed_call, fn, args)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        wait = max(0.0, started - enqueued)
+        with self._lock:
+            self.completed += 1
+            self._waits.append(wait)
+            self.max_wait = max(self.max_wait, wait)
+        return result
+
+    def restart(self):
+        """Replace the workers, e.g. so process workers pick up a reloaded model."""
+        old, self._executor = self._executor, self._make_executor()
+        old.shutdown(wait=False)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            in_flight = self._in_flight
+
+        def pct(q):
+            return waits[min(len(waits) - 1, int(q * len(waits)))] * 1000 if waits else 0.0
+
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_ms_p50": pct(0.50),
+            "wait_ms_p99": pct(0.99),
+            "wait_ms_max": self.max_wait * 1000,
+        }
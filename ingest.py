@@ -0,0 +1,150 @@
+# ingest.py
+"""Columnar, typed cache of salary.csv.
+
+    python ingest.py salary.csv salary_cache/
+
+Parses the CSV once, in chunks, and stores every column as a NumPy array:
+
+    <COLUMN>.codes.npy        dictionary codes for categoricals (int8/int16/int32)
+    <COLUMN>.categories.json  the dictionary, code -> value
+    <COLUMN>.npy              float64 for numeric columns
+    meta.json                 row count, column kinds and the source file's size/mtime
+
+Categorical values are upper-cased like SalaryInput fields and column
+names like ColumnNameCleaner ('AGENCY NAME' -> 'AGENCY_NAME'). load() memory-maps
+the arrays and wraps them as pandas Categoricals, so reloading skips all parsing.
+Codes are stored in the integer width pandas itself picks for the number of
+categories, so neither the Categoricals nor the DataFrame copy them: every
+column stays backed by the mapped file.
+"""
+import json
+import mmap
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ["AGENCY NAME", "CLASS TITLE", "ETHNICITY", "GENDER", "STATUS"]
+NUMERIC_COLUMNS = ["ANNUAL", "MONTHLY", "HRLY RATE", "HRS PER WK"]
+# Bumped when the file layout changes, so older caches are rebuilt
+FORMAT_VERSION = 2
+
+
+def clean_name(column):
+    # Same rule as custom_transformers.ColumnNameCleaner
+    return str(column).strip().upper().replace(" ", "_")
+
+
+def _codes_dtype(n_categories):
+    # Same widths as pandas' Categorical codes: any other dtype is copied on load
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _source_signature(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def build(csv_path, cache_dir, categorical=CATEGORICAL_COLUMNS, numeric=NUMERIC_COLUMNS, chunk_size=250_000):
+    header = pd.read_csv(csv_path, nrows=0).columns
+    numeric = [c for c in numeric if c in header]
+    os.makedirs(cache_dir, exist_ok=True)
+
+    dictionaries = {c: {} for c in categorical}
+    codes = {c: [] for c in categorical}
+    values = {c: [] for c in numeric}
+    rows = 0
+    for chunk in pd.read_csv(csv_path, usecols=categorical + numeric, chunksize=chunk_size,
+                             dtype={c: str for c in categorical}):
+        for c in categorical:
+            # NaN stays -1, like pandas Categorical codes
+            column = chunk[c].str.upper()
+            inverse, uniques = pd.factorize(column)
+            dictionary = dictionaries[c]
+            remap = np.array([dictionary.setdefault(v, len(dictionary)) for v in uniques], dtype=np.int64)
+            codes[c].append(np.where(inverse >= 0, remap[inverse] if len(remap) else -1, -1))
+        for c in numeric:
+            values[c].append(pd.to_numeric(chunk[c], errors="coerce").to_numpy(dtype=np.float64))
+        rows += len(chunk)
+
+    kinds = {}
+    for c in categorical:
+        name = clean_name(c)
+        dictionary = dictionaries[c]
+        merged = np.concatenate(codes[c]) if codes[c] else np.empty(0)
+        np.save(os.path.join(cache_dir, f"{name}.codes.npy"), merged.astype(_codes_dtype(len(dictionary))))
+        with open(os.path.join(cache_dir, f"{name}.categories.json"), "w", encoding="utf-8") as f:
+            json.dump(list(dictionary), f)
+        kinds[name] = "categorical"
+    for c in numeric:
+        name = clean_name(c)
+        merged = np.concatenate(values[c]) if values[c] else np.empty(0)
+        np.save(os.path.join(cache_dir, f"{name}.npy"), merged)
+        kinds[name] = "numeric"
+
+    with open(os.path.join(cache_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": FORMAT_VERSION, "rows": rows, "columns": kinds,
+                   "source": _source_signature(csv_path)}, f)
+    return rows
+
+
+def is_fresh(csv_path, cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get("version") == FORMAT_VERSION and meta.get("source") == _source_signature(csv_path)
+
+
+def load(cache_dir, columns=None):
+    """Load the cache as a DataFrame of Categoricals and float64 columns."""
+    with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    data = {}
+    for name, kind in meta["columns"].items():
+        if columns is not None and name not in columns:
+            continue
+        if kind == "categorical":
+            codes = np.load(os.path.join(cache_dir, f"{name}.codes.npy"), mmap_mode="r")
+            with open(os.path.join(cache_dir, f"{name}.categories.json"), encoding="utf-8") as f:
+                categories = json.load(f)
+            data[name] = pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories), validate=False)
+        else:
+            data[name] = np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+    # copy=False: no consolidation into 2-D blocks, each column keeps its map
+    return pd.DataFrame(data, copy=False)
+
+
+def is_memory_mapped(array):
+    """True if array is a view of a memory-mapped file (not a copy of one)."""
+    while array is not None:
+        if isinstance(array, mmap.mmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def load_salary_data(path, cache_dir=None, columns=None):
+    """salary.csv through the cache: (re)build it if stale, then load.
+
+    path may also be an existing cache directory.
+    """
+    if os.path.isdir(path):
+        return load(path, columns)
+    cache_dir = cache_dir or os.path.splitext(path)[0] + "_cache"
+    if not is_fresh(path, cache_dir):
+        build(path, cache_dir)
+    return load(cache_dir, columns)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python ingest.py salary.csv salary_cache/")
+        sys.exit(2)
+    rows = build(sys.argv[1], sys.argv[2])
+    print(f"Cached {rows:,} rows from {sys.argv[1]} in {sys.argv[2]}")
@@ -0,0 +1,124 @@
+# log_config.py
+"""Logging setup for the API: optional JSON lines, queue-backed handlers and
+a sampled logger for per-request messages.
+
+    SALARY_LOG_LEVEL=INFO         root level
+    SALARY_LOG_FORMAT=text|json   json writes one object per line, extra fields included
+    SALARY_LOG_ASYNC=1            handlers run on a background thread (QueueHandler/QueueListener)
+    SALARY_HOT_LOG_LEVEL=INFO     level of the per-request "hot path" logger
+    SALARY_HOT_LOG_SAMPLE=1.0     fraction of hot path records kept (warnings and up are always kept)
+
+In async mode the request thread only builds the LogRecord and puts it on a
+queue; formatting the message and writing it happen on the listener thread.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """Keeps a fraction of records below WARNING; warnings and errors always pass.
+
+    The coin is flipped before the LogRecord is built, so dropped messages
+    cost next to nothing.
+    """
+
+    def __init__(self, logger, rate):
+        super().__init__(logger, {})
+        self.rate = rate
+        self.dropped = 0
+
+    def process(self, msg, kwargs):
+        return msg, kwargs
+
+    def log(self, level, msg, *args, **kwargs):
+        if level < logging.WARNING and self.rate < 1.0 and random.random() >= self.rate:
+            self.dropped += 1
+            return
+        super().log(level, msg, *args, **kwargs)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # The stock prepare() formats the message on the calling thread so the
+    # record can be pickled. The queue is in-process, so leave the formatting
+    # to the listener thread. Callers must not mutate the args they log.
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+
+
+def configure_logging(level=None, fmt=None, async_mode=None):
+    """Configure the root logger from arguments or SALARY_LOG_* variables.
+
+    Keeps handlers that are already installed (e.g. by serve.py) and only adds
+    a stderr handler when there are none, like logging.basicConfig.
+    """
+    global _listener
+    level = level or os.getenv("SALARY_LOG_LEVEL", "INFO")
+    fmt = fmt or os.getenv("SALARY_LOG_FORMAT", "text")
+    if async_mode is None:
+        async_mode = os.getenv("SALARY_LOG_ASYNC", "0") == "1"
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return _listener
+    if not root.handlers:
+        logging.basicConfig()
+    if fmt == "json":
+        for handler in root.handlers:
+            handler.setFormatter(JsonFormatter())
+
+    if async_mode:
+        handlers = list(root.handlers)
+        records = queue.SimpleQueue()
+        _listener = QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        root.handlers = [_DeferredQueueHandler(records)]
+        # Flush what's queued on exit; pre-forked workers need their own listener thread
+        atexit.register(_listener.stop)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_listener)
+    return _listener
+
+
+def _restart_listener():
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+def hot_path_logger(name, level=None, sample_rate=None):
+    """Logger for per-request messages with its own level and sampling."""
+    level = level or os.getenv("SALARY_HOT_LOG_LEVEL", "INFO")
+    if sample_rate is None:
+        sample_rate = float(os.getenv("SALARY_HOT_LOG_SAMPLE", "1.0"))
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    return SampledLogger(logger, sample_rate)
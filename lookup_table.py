@@ -0,0 +1,159 @@
+# lookup_table.py
+"""Precomputed prediction table for the finite categorical input space.
+
+Every (agency, class title) pair that occurs in salary.csv is crossed with all
+ethnicity / gender / status values and scored offline. Predictions are stored as
+a dense float64 array indexed by category codes:
+
+    <name>.npy   values[pair, ethnicity, gender, status]  (memory-mapped at load)
+    <name>.json  category vocabularies, pair codes and the model checksum
+
+Build it with:
+
+    python lookup_table.py salary.csv model_simple.pkl prediction_table
+
+and serve it with SALARY_PREDICTION_TABLE=prediction_table. Combinations that
+are not in the table return None so the caller can fall back to the live model.
+"""
+import hashlib
+import json
+import sys
+
+import numpy as np
+
+# Raw salary.csv headers -> SalaryInput field names
+RAW_COLUMNS = {
+    "AGENCY NAME": "AGENCY_NAME",
+    "CLASS TITLE": "CLASS_TITLE",
+    "ETHNICITY": "ETHNICITY",
+    "GENDER": "GENDER",
+    "STATUS": "STATUS",
+}
+SMALL_FIELDS = ["ETHNICITY", "GENDER", "STATUS"]
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionTable:
+    def __init__(self, values, agencies, titles, pairs, small_vocabularies, model_checksum=None):
+        self.values = values
+        self.model_checksum = model_checksum
+        self.agency_codes = {a: i for i, a in enumerate(agencies)}
+        self.title_codes = {t: i for i, t in enumerate(titles)}
+        self.pair_rows = {(int(a), int(t)): row for row, (a, t) in enumerate(pairs)}
+        self.small_codes = {f: {v: i for i, v in enumerate(small_vocabularies[f])} for f in SMALL_FIELDS}
+
+    def __len__(self):
+        return int(self.values.size)
+
+    @classmethod
+    def load(cls, name):
+        with open(f"{name}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        values = np.load(f"{name}.npy", mmap_mode="r")
+        return cls(values, meta["agencies"], meta["titles"], meta["pairs"],
+                   meta["small_vocabularies"], meta.get("model_checksum"))
+
+    def lookup(self, record):
+        """Return the stored prediction for record, or None if it isn't covered."""
+        agency = self.agency_codes.get(record["AGENCY_NAME"])
+        title = self.title_codes.get(record["CLASS_TITLE"])
+        row = self.pair_rows.get((agency, title))
+        if row is None:
+            return None
+        index = [row]
+        for f in SMALL_FIELDS:
+            code = self.small_codes[f].get(record[f])
+            if code is None:
+                return None
+            index.append(code)
+        return float(self.values[tuple(index)])
+
+
+def build_table(data, model, name, model_checksum=None, chunk_size=200_000):
+    """Score every observed (agency, title) pair x small-field combination and save it.
+
+    data is a DataFrame with SalaryInput column names.
+    """
+    import pandas as pd
+
+    data = data[list(RAW_COLUMNS.values())].dropna()
+    pairs_df = data[["AGENCY_NAME", "CLASS_TITLE"]].drop_duplicates()
+    agencies = sorted(pairs_df["AGENCY_NAME"].unique())
+    titles = sorted(pairs_df["CLASS_TITLE"].unique())
+    agency_codes = {a: i for i, a in enumerate(agencies)}
+    title_codes = {t: i for i, t in enumerate(titles)}
+    pairs = sorted((agency_codes[a], title_codes[t]) for a, t in pairs_df.itertuples(index=False))
+
+    small = {f: sorted(data[f].unique()) for f in SMALL_FIELDS}
+    shape = (len(pairs),) + tuple(len(small[f]) for f in SMALL_FIELDS)
+    per_pair = int(np.prod(shape[1:]))
+
+    # One row per table cell, in C order of the value array
+    grid = np.array(np.meshgrid(*[np.arange(len(small[f])) for f in SMALL_FIELDS], indexing="ij"))
+    grid = grid.reshape(len(SMALL_FIELDS), -1)
+    small_columns = {f: np.asarray(small[f], dtype=object)[grid[i]] for i, f in enumerate(SMALL_FIELDS)}
+
+    values = np.empty(len(pairs) * per_pair, dtype=np.float64)
+    pairs_per_chunk = max(1, chunk_size // per_pair)
+    for start in range(0, len(pairs), pairs_per_chunk):
+        chunk = pairs[start:start + pairs_per_chunk]
+        frame = pd.DataFrame({
+            "AGENCY_NAME": np.repeat([agencies[a] for a, _ in chunk], per_pair),
+            "CLASS_TITLE": np.repeat([titles[t] for _, t in chunk], per_pair),
+            **{f: np.tile(small_columns[f], len(chunk)) for f in SMALL_FIELDS},
+        })
+        values[start * per_pair:(start + len(chunk)) * per_pair] = model.predict(frame)
+
+    np.save(f"{name}.npy", values.reshape(shape))
+    with open(f"{name}.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "agencies": agencies,
+            "titles": titles,
+            "pairs": pairs,
+            "small_vocabularies": small,
+            "model_checksum": model_checksum,
+        }, f)
+    return PredictionTable.load(name)
+
+
+def read_salary_csv(path):
+    import os
+
+    import pandas as pd
+
+    if os.path.isdir(path):
+        # Columnar cache from ingest.py, already normalized. Drop missing values
+        # first: astype(str) would turn them into 'nan' categories
+        import ingest
+        data = ingest.load(path, columns=list(RAW_COLUMNS.values()))
+        return data.dropna().astype(str)
+
+    data = pd.read_csv(path, usecols=list(RAW_COLUMNS), dtype=str)
+    data = data.rename(columns=RAW_COLUMNS)
+    # Same upper-casing as SalaryInput
+    for column in data.columns:
+        data[column] = data[column].str.upper()
+    return data
+
+
+if __name__ == "__main__":
+    import time
+
+    import joblib
+
+    if len(sys.argv) != 4:
+        print("usage: python lookup_table.py salary.csv model_simple.pkl prediction_table")
+        sys.exit(2)
+    csv_path, model_path, name = sys.argv[1:]
+    started = time.perf_counter()
+    table = build_table(read_salary_csv(csv_path), joblib.load(model_path), name,
+                        model_checksum=file_checksum(model_path))
+    print(f"Wrote {name}.npy / {name}.json: {len(table.pair_rows)} pairs, "
+          f"{len(table)} predictions in {time.perf_counter() - started:.1f}s")
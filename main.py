@@ -1,17 +1,60 @@
 # main_simple.py
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-import pandas as pd
-import joblib
+import asyncio
 import logging
-from pydantic import BaseModel, Field, field_validator
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+from pydantic import BaseModel, Field, field_validator, ValidationError
+import metrics
+from compiled_model import FEATURE_COLUMNS, compile_pipeline, extract_vocabulary, load_compiled
+from lookup_table import PredictionTable, file_checksum
+from prediction_cache import PredictionCache
+from shared_cache import SharedCache
+from inference_pool import InferencePool, PoolOverloaded
+from micro_batcher import MicroBatcher
+from log_config import configure_logging, hot_path_logger
+from suggest_index import SuggestIndex
+from stats_cube import StatsCube
+from canonical import Canonicalizer, load_aliases
+import wire_formats
 
+# pandas, joblib and sklearn are imported lazily: serving the slim .npz
+# artifact (see export_model.py) never needs them
 
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging (SALARY_LOG_* variables, see log_config.py)
+configure_logging()
 logger = logging.getLogger(__name__)
+# Per-request messages: own level (SALARY_HOT_LOG_LEVEL) and sampling (SALARY_HOT_LOG_SAMPLE)
+request_logger = hot_path_logger(__name__ + ".requests")
+
+# Served at /metrics in the Prometheus text format. Each process (pre-fork
+# worker, process executor child) keeps its own numbers.
+registry = metrics.Registry()
+REQUESTS = registry.counter("salary_requests_total", "HTTP requests by route and status code",
+                            ["endpoint", "status"])
+REQUEST_ERRORS = registry.counter("salary_request_errors_total", "Requests answered with a 4xx/5xx status",
+                                  ["endpoint", "status"])
+REQUEST_SECONDS = registry.histogram("salary_request_duration_seconds", "End-to-end request latency",
+                                     ["endpoint"])
+STAGE_SECONDS = registry.histogram("salary_stage_duration_seconds", "Time spent in each stage of a prediction",
+                                   ["stage"])
+ROW_ERRORS = registry.counter("salary_row_errors_total", "Batch rows that failed validation or scoring",
+                              ["endpoint"])
+CACHE_LOOKUPS = registry.counter("salary_cache_lookups_total", "Prediction cache lookups by tier (local, shared)",
+                                 ["tier", "result"])
+MODEL_LOADS = registry.counter("salary_model_loads_total", "Model load attempts", ["result"])
+MODEL_LOAD_SECONDS = registry.gauge("salary_model_load_seconds", "Duration of the last successful model load")
+MODEL_LOADED_AT = registry.gauge("salary_model_loaded_timestamp_seconds", "When the active model went live")
+MODEL_INFO = registry.gauge("salary_model_info", "Active model version", ["version"])
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -22,15 +65,13 @@ class SalaryInput(BaseModel):
     ETHNICITY: str = Field(..., description="White, Black, Hispanic, Other")
     GENDER: str = Field(..., description="Male or Female")
     STATUS: str = Field(..., description="Employment status:Full-Time or Part-Time")
-    
-    # ✅ automatically convert all string fields to uppercase
-    @field_validator("AGENCY_NAME", "CLASS_TITLE", "ETHNICITY", "GENDER", "STATUS", mode="before")
-    def ensure_uppercase(cls, v):
-        if isinstance(v, str):
-            return v.upper()
-        return v
 
+    # No Python validators here: the "validate" stage is timed by the caller
+    # (a wrap validator doubled the cost of validating a record)
     class Config:
+        # ✅ automatically convert all string fields to uppercase (in pydantic-core,
+        # no Python call per field); aliases are resolved later by the Canonicalizer
+        str_to_upper = True
         json_schema_extra = {
             "example": {
                 "AGENCY_NAME": "TEXAS DEPARTMENT OF CRIMINAL JUSTICE",
@@ -41,15 +82,324 @@ class SalaryInput(BaseModel):
             }
         }
 
-app = FastAPI(title="Texas Salary Estimator API")
+class SalaryBatchInput(BaseModel):
+    # Records are validated one by one so a bad row doesn't reject the whole batch
+    records: List[Dict[str, Any]] = Field(..., description="List of SalaryInput records")
+
+
+class SalaryColumnarInput(BaseModel):
+    # Columnar variant: one list per field, all of the same length
+    AGENCY_NAME: List[str]
+    CLASS_TITLE: List[str]
+    ETHNICITY: List[str]
+    GENDER: List[str]
+    STATUS: List[str]
+
+
+# Grid fields accept this instead of a list to mean every category the model knows
+GRID_ALL = "ALL"
+
+
+class SalaryGridInput(BaseModel):
+    # Each field is a single value, a list of values or "ALL"; the cartesian
+    # product of all fields is scored
+    AGENCY_NAME: Union[str, List[str]]
+    CLASS_TITLE: Union[str, List[str]]
+    ETHNICITY: Union[str, List[str]]
+    GENDER: Union[str, List[str]]
+    STATUS: Union[str, List[str]]
+    # Page of the row-major grid to return
+    offset: int = Field(0, ge=0)
+    limit: int = Field(10000, ge=1, le=100000)
+    # Repeat the varying dimensions per row (otherwise rebuild them from "dimensions")
+    include_columns: bool = True
+
+    @field_validator("AGENCY_NAME", "CLASS_TITLE", "ETHNICITY", "GENDER", "STATUS", mode="before")
+    def ensure_uppercase(cls, v):
+        # Same normalization as SalaryInput, duplicates dropped in order
+        if isinstance(v, str):
+            return v.upper()
+        if isinstance(v, list):
+            return list(dict.fromkeys(x.upper() if isinstance(x, str) else x for x in v))
+        return v
+
+
+# Known-good input used to warm up a freshly loaded model before it goes live
+CANARY_INPUT = SalaryInput.model_config["json_schema_extra"]["example"]
+
+# Set SALARY_COMPILED_MODEL=1 to serve from the pandas-free compiled predictor
+USE_COMPILED_MODEL = os.getenv("SALARY_COMPILED_MODEL", "0") == "1"
+# Optional precomputed table built with lookup_table.py (path without extension)
+PREDICTION_TABLE_PATH = os.getenv("SALARY_PREDICTION_TABLE")
+# Response cache: max entries (0 disables) and time-to-live in seconds
+CACHE_SIZE = int(os.getenv("SALARY_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("SALARY_CACHE_TTL", "3600"))
+# Second cache tier shared by all worker processes: a memory-mapped file (e.g. in
+# /dev/shm) and its number of slots; unset disables it (see shared_cache.py)
+SHARED_CACHE_PATH = os.getenv("SALARY_SHARED_CACHE_PATH")
+SHARED_CACHE_SLOTS = int(os.getenv("SALARY_SHARED_CACHE_SLOTS", "65536"))
+# Inference executor: "thread" or "process", worker count and how many
+# requests may wait for a worker before new ones are shed with a 503
+EXECUTOR_KIND = os.getenv("SALARY_EXECUTOR", "thread")
+EXECUTOR_WORKERS = int(os.getenv("SALARY_EXECUTOR_WORKERS", "0")) or None
+MAX_QUEUE = int(os.getenv("SALARY_MAX_QUEUE", "256"))
+# Micro-batching of concurrent /predict calls: max rows per batch (0 disables)
+# and how long the first request may wait for others to join
+BATCH_MAX_SIZE = int(os.getenv("SALARY_BATCH_MAX_SIZE", "0"))
+BATCH_MAX_WAIT_MS = float(os.getenv("SALARY_BATCH_MAX_WAIT_MS", "2"))
+# /predict/grid: largest grid scored in one request, and how many scored grids
+# are kept (per model version) so paging through one doesn't rescore it
+GRID_MAX_ROWS = int(os.getenv("SALARY_GRID_MAX_ROWS", "1000000"))
+GRID_CACHE_SIZE = int(os.getenv("SALARY_GRID_CACHE_SIZE", "32"))
+# Total size of the cached grids; a grid bigger than this is never cached
+GRID_CACHE_MB = float(os.getenv("SALARY_GRID_CACHE_MB", "64"))
+
+# model_simple.pkl, or the slim model_simple.npz written by export_model.py
+MODEL_PATH = os.getenv("SALARY_MODEL_PATH", 'model_simple.pkl')
+# Memory-map the model's numpy arrays so pre-forked workers share them (see serve.py)
+MODEL_MMAP = os.getenv("SALARY_MODEL_MMAP", "0") == "1"
+# Poll model_simple.pkl every N seconds and hot-reload it when it changes (0 disables)
+MODEL_WATCH_SECONDS = float(os.getenv("SALARY_MODEL_WATCH_SECONDS", "0"))
+# If set, /admin/reload requires a matching X-Admin-Token header
+ADMIN_TOKEN = os.getenv("SALARY_ADMIN_TOKEN")
+# Observed pay statistics built with stats_cube.py, served at /stats
+STATS_CUBE_PATH = os.getenv("SALARY_STATS_CUBE", "salary_stats.npz")
+# JSON file of extra input aliases, field -> alias -> canonical value (see canonical.py)
+ALIASES_PATH = os.getenv("SALARY_ALIASES_PATH")
+
+
+class ModelState:
+    # Everything derived from one model file. Reloads build a new instance and
+    # swap the module-level reference, so requests that already grabbed the
+    # old one finish on the old version.
+    def __init__(self, model, version, compiled=None, table=None, suggest=None, canonical=None):
+        self.model = model
+        self.version = version
+        self.compiled = compiled
+        self.table = table
+        # field -> SuggestIndex over the categories this model knows
+        self.suggest = suggest or {}
+        # Canonicalizer resolving request values to known categories and codes
+        self.canonical = canonical
+        # A Pipeline split into its transformers and final estimator, for per-stage timings
+        self.preprocess, self.regressor = None, None
+        if hasattr(model, "steps") and len(model.steps) > 1:
+            self.preprocess, self.regressor = model[:-1], model.steps[-1][1]
+        self.loaded_at = time.time()
+
+
+model_state = None
+_reload_lock = threading.Lock()
+# Set by serve.py in its workers: asks the parent to reload every worker
+reload_broadcast = None
+prediction_cache = PredictionCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+grid_cache = PredictionCache(maxsize=GRID_CACHE_SIZE, ttl=CACHE_TTL,
+                             max_bytes=int(GRID_CACHE_MB * 1024 * 1024), sizeof=lambda values: values.nbytes)
+
+
+def open_shared_cache(path=SHARED_CACHE_PATH):
+    if not path:
+        return None
+    try:
+        cache = SharedCache(path, slots=SHARED_CACHE_SLOTS, ttl=CACHE_TTL)
+        logger.info(f"✅ Shared prediction cache at {path} ({cache.slots:,} slots)")
+        return cache
+    except Exception as e:
+        logger.error(f"❌ Shared prediction cache unavailable, using the local cache only: {e}")
+        return None
+
+
+shared_cache = open_shared_cache()
+inference_pool = InferencePool(kind=EXECUTOR_KIND, workers=EXECUTOR_WORKERS, max_queue=MAX_QUEUE)
+
+
+def load_stats_cube(path=STATS_CUBE_PATH):
+    # Data, not model: independent of model reloads, optional
+    if not os.path.exists(path):
+        return None
+    try:
+        cube = StatsCube.load(path)
+        logger.info(f"✅ Salary statistics loaded ({len(cube):,} cells)")
+        return cube
+    except Exception as e:
+        logger.error(f"❌ Salary statistics loading failed: {e}")
+        return None
+
+
+stats_cube = load_stats_cube()
+
+registry.gauge("salary_cache_entries", "Entries in the prediction cache",
+               function=lambda: prediction_cache.stats()["size"])
+registry.gauge("salary_pool_in_flight", "Inference jobs running or queued",
+               function=lambda: inference_pool.stats()["in_flight"])
+
+
+def load_model(path=MODEL_PATH):
+    global model_state
+
+    with _reload_lock:
+        started = time.perf_counter()
+        new_state = _build_state(path)
+        if new_state is None:
+            MODEL_LOADS.inc("failure")
+            return False
+
+        # Warm the new model up before any request can see it
+        try:
+            canary = _predict_one(new_state, CANARY_INPUT)
+            if not math.isfinite(canary):
+                raise ValueError(f"non-finite prediction {canary}")
+        except Exception as e:
+            logger.error(f"❌ Canary prediction failed, keeping the current model: {e}")
+            MODEL_LOADS.inc("failure")
+            return False
+
+        previous = model_state.version if model_state is not None else None
+        model_state = new_state
+        MODEL_LOADS.inc("success")
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started)
+        MODEL_LOADED_AT.set(new_state.loaded_at)
+        MODEL_INFO.clear()
+        MODEL_INFO.set(1, new_state.version)
+        # Process workers hold their own copy of the model
+        if inference_pool.kind == "process":
+            inference_pool.restart()
+        # Cache keys include the version, this just frees the old entries
+        prediction_cache.clear()
+        grid_cache.clear()
+
+    logger.info(f"✅ Model {new_state.version} is live (previous: {previous}, canary ${canary:,.2f})")
+    return True
+
+
+def _build_state(path):
+    new_model, new_compiled = None, None
+    if path.endswith(".npz"):
+        # Slim artifact: numpy arrays only, versioned like the pickle it came from
+        try:
+            new_compiled = load_compiled(path)
+            version = (new_compiled.source_checksum or file_checksum(path))[:12]
+            logger.info(f"✅ Compiled model artifact loaded ({new_compiled.summary})")
+        except Exception as e:
+            logger.error(f"❌ Model loading failed: {e}")
+            return None
+    else:
+        # Load the simplified model
+        try:
+            import joblib
+            new_model = joblib.load(path, mmap_mode='r' if MODEL_MMAP else None)
+            version = file_checksum(path)[:12]
+            logger.info("✅ Simplified model loaded successfully!")
+        except Exception as e:
+            logger.error(f"❌ Model loading failed: {e}")
+            return None
+
+    if new_model is not None and USE_COMPILED_MODEL:
+        try:
+            new_compiled = compile_pipeline(new_model)
+            logger.info(f"✅ Compiled predictor ready ({new_compiled.summary})")
+        except Exception as e:
+            logger.error(f"❌ Model compilation failed, using sklearn pipeline: {e}")
+
+    new_table = None
+    if PREDICTION_TABLE_PATH:
+        try:
+            table = PredictionTable.load(PREDICTION_TABLE_PATH)
+            if table.model_checksum is not None and not table.model_checksum.startswith(version):
+                logger.warning("⚠️ Prediction table was built for a different model, ignoring it")
+            else:
+                new_table = table
+                logger.info(f"✅ Prediction table loaded ({len(table):,} precomputed predictions)")
+        except Exception as e:
+            logger.error(f"❌ Prediction table loading failed: {e}")
+
+    new_suggest, new_canonical = {}, None
+    try:
+        if new_compiled is not None:
+            vocabulary = new_compiled.vocabularies
+        else:
+            vocabulary = extract_vocabulary(new_model)
+        new_suggest = {f: SuggestIndex(vocabulary[f]) for f in FEATURE_COLUMNS if f in vocabulary}
+    except Exception as e:
+        vocabulary = None
+        logger.warning(f"⚠️ Could not build the suggestion index: {e}")
 
-# Load the simplified model
-model = None
-try:
-    model = joblib.load('model_simple.pkl')
-    logger.info("✅ Simplified model loaded successfully!")
-except Exception as e:
-    logger.error(f"❌ Model loading failed: {e}")
+    if vocabulary and all(f in vocabulary for f in FEATURE_COLUMNS):
+        try:
+            aliases = load_aliases(ALIASES_PATH) if ALIASES_PATH else None
+            # Codes match the compiled predictor's when there is one
+            new_canonical = Canonicalizer({f: vocabulary[f] for f in FEATURE_COLUMNS}, aliases)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not build the canonicalizer: {e}")
+
+    return ModelState(new_model, version, compiled=new_compiled, table=new_table, suggest=new_suggest,
+                      canonical=new_canonical)
+
+
+def _watch_model_file(path, interval, stop):
+    # Reload once the file has changed and stopped changing for one interval
+    def signature():
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    current = signature()
+    while not stop.wait(interval):
+        seen = signature()
+        if seen is None or seen == current:
+            continue
+        if stop.wait(interval) or signature() != seen:
+            continue
+        logger.info(f"🔄 {path} changed on disk, reloading")
+        load_model(path)
+        current = seen
+
+
+@asynccontextmanager
+async def lifespan(app):
+    stop = threading.Event()
+    if MODEL_WATCH_SECONDS > 0:
+        threading.Thread(target=_watch_model_file, args=(MODEL_PATH, MODEL_WATCH_SECONDS, stop),
+                         name="model-watcher", daemon=True).start()
+    yield
+    stop.set()
+    inference_pool.shutdown()
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (cheaper than BaseHTTPMiddleware): counts requests
+    # and times them per route template, so path parameters can't blow up the labels
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+            REQUESTS.inc(endpoint, str(status))
+            if status >= 400:
+                REQUEST_ERRORS.inc(endpoint, str(status))
+
+
+app = FastAPI(title="Texas Salary Estimator API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def home():
@@ -57,43 +407,590 @@ def home():
 
 @app.get("/health")
 def health_check():
-    if model is None:
+    if model_state is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
-    return {"status": "healthy"}
+    return {"status": "healthy", "model_version": model_state.version}
 
-@app.post("/predict")
-def predict_salary(user_input: SalaryInput):
-    if model is None:
+@app.get("/suggest")
+def suggest(field: str, q: str, limit: int = 10):
+    # Autocomplete against the canonical categories the model was trained on
+    current = model_state
+    if current is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
-    
+    field = field.upper()
+    index = current.suggest.get(field)
+    if index is None:
+        raise HTTPException(status_code=422, detail=f"Unknown field {field}, expected one of {FEATURE_COLUMNS}")
+    return {
+        "field": field,
+        "query": q,
+        "known": q.upper() in index,
+        "suggestions": index.suggest(q, limit=max(1, min(limit, 50))),
+        "model_version": current.version,
+    }
+
+@app.get("/stats")
+def observed_stats(AGENCY_NAME: Optional[str] = None, CLASS_TITLE: Optional[str] = None,
+                   ETHNICITY: Optional[str] = None, GENDER: Optional[str] = None,
+                   STATUS: Optional[str] = None, min_count: int = 1):
+    # Observed ANNUAL pay for a combination; omitted fields are rolled up, and
+    # fields are dropped (ethnicity, gender, status, agency) until min_count is met
+    if stats_cube is None:
+        raise HTTPException(status_code=503, detail="Salary statistics not loaded")
+    record = {"AGENCY_NAME": AGENCY_NAME, "CLASS_TITLE": CLASS_TITLE, "ETHNICITY": ETHNICITY,
+              "GENDER": GENDER, "STATUS": STATUS}
+    record = {name: value.upper() for name, value in record.items() if value}
+    filters, cell = stats_cube.lookup_with_fallback(record, min_count=max(1, min_count))
+    if cell is None:
+        raise HTTPException(status_code=404, detail="No observed salaries for this combination")
+    return {"requested": record, "filters": filters, "target": stats_cube.target, **cell}
+
+@app.get("/stats/summary")
+def observed_stats_summary():
+    if stats_cube is None:
+        raise HTTPException(status_code=503, detail="Salary statistics not loaded")
+    return stats_cube.summary()
+
+@app.post("/admin/reload")
+async def reload_model(x_admin_token: Optional[str] = Header(None)):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    previous = model_state.version if model_state is not None else None
+    if reload_broadcast is not None:
+        # Pre-fork workers each hold their own model: serve.py signals all of
+        # them, and each reloads in the background
+        reload_broadcast()
+        return Response(status_code=202, media_type="application/json", content=wire_formats.dumps_json(
+            {"message": "Reload requested on all workers", "model_version": previous}))
+    # Load off the event loop so in-flight requests keep being served
+    if not await asyncio.to_thread(load_model):
+        raise HTTPException(status_code=500, detail="Reload failed, still serving the previous model")
+    return {"message": "Model reloaded", "model_version": model_state.version, "previous_version": previous}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/cache/stats")
+def cache_stats():
+    stats = prediction_cache.stats()
+    if shared_cache is not None:
+        stats["shared"] = shared_cache.stats()
+    return stats
+
+@app.get("/pool/stats")
+def pool_stats():
+    stats = inference_pool.stats()
+    if micro_batcher is not None:
+        stats["micro_batching"] = micro_batcher.stats()
+    return stats
+
+# Under overload every request would log: warn at most once per interval with a count
+SHED_LOG_INTERVAL = 10.0
+_shed_log = {"last": 0.0, "count": 0}
+
+def _log_shed(error):
+    logger.debug(f"Shedding request: {error}")
+    _shed_log["count"] += 1
+    now = time.monotonic()
+    if now - _shed_log["last"] >= SHED_LOG_INTERVAL:
+        logger.warning(f"⚠️ Shed {_shed_log['count']} request(s) since the last warning: {error}")
+        _shed_log["last"], _shed_log["count"] = now, 0
+
+async def _run_inference(fn, current, *args):
+    # Hand CPU-bound work to the executor; shed load once its queue is full.
+    # Process workers use their own copy of the model instead of a pickled one.
+    if inference_pool.kind == "process":
+        current = None
+    started = time.perf_counter()
     try:
-        # Convert input to DataFrame with cleaned column names
-        input_data = {
-            "AGENCY_NAME": user_input.AGENCY_NAME,  # Use cleaned name
-            "CLASS_TITLE": user_input.CLASS_TITLE,  # Use cleaned name  
-            "ETHNICITY": user_input.ETHNICITY,
-            "GENDER": user_input.GENDER,
-            "STATUS": user_input.STATUS
-        }
+        return await inference_pool.submit(fn, current, *args)
+    except PoolOverloaded as e:
+        _log_shed(e)
+        raise HTTPException(status_code=503, detail="Server overloaded, please retry",
+                            headers={"Retry-After": "1"})
+    finally:
+        # Queue wait plus the work itself
+        STAGE_SECONDS.observe_since(started, "executor")
 
-        input_df = pd.DataFrame([input_data])
-        
-        logger.info(f"Input DataFrame columns: {list(input_df.columns)}")
-        logger.info(f"Input data: {input_data}")
+def _predict_one(current, input_data, encoded=None):
+    current = current or model_state
+    if current.table is not None:
+        started = time.perf_counter()
+        cached = current.table.lookup(input_data)
+        STAGE_SECONDS.observe_since(started, "table_lookup")
+        if cached is not None:
+            return cached
+
+    request_logger.info("Input data: %s", input_data)
+    return _score_record(current, input_data, encoded)
+
+def _codes_for(current, encoded):
+    # encoded is (model version, codes) from the Canonicalizer; the codes are
+    # only usable by the compiled predictor of that same version
+    if encoded is None or current.compiled is None or encoded[0] != current.version:
+        return None
+    return encoded[1]
+
+def _score_record(current, record, encoded=None):
+    started = time.perf_counter()
+    if current.compiled is not None:
+        codes = _codes_for(current, encoded)
+        if codes is not None:
+            prediction = float(current.compiled.predict_codes_one(codes))
+        else:
+            prediction = float(current.compiled.predict_one(record))
+        STAGE_SECONDS.observe_since(started, "compiled")
+        return prediction
+
+    import pandas as pd
+    input_df = pd.DataFrame([record], columns=FEATURE_COLUMNS)
+    started = STAGE_SECONDS.observe_since(started, "dataframe")
+
+    request_logger.info("Input DataFrame columns: %s", FEATURE_COLUMNS)
+
+    prediction = _predict_frame(current, input_df, started)
+    return float(prediction[0])
+
+def _predict_frame(current, input_df, started):
+    # Same as model.predict, but preprocessing and the regressor are timed separately
+    if current.preprocess is None:
+        prediction = current.model.predict(input_df)
+    else:
+        X = current.preprocess.transform(input_df)
+        started = STAGE_SECONDS.observe_since(started, "preprocess")
+        prediction = current.regressor.predict(X)
+    STAGE_SECONDS.observe_since(started, "model")
+    return prediction
+
+def _prediction_interval(current, record, encoded=None):
+    # Observed salaries in the leaf this record lands in, when the artifact
+    # carries leaf intervals (export_model.py --data); None otherwise
+    compiled = current.compiled
+    if compiled is None or not compiled.has_intervals:
+        return None
+    try:
+        codes = _codes_for(current, encoded)
+        leaf = compiled.leaf_codes(codes) if codes is not None else compiled.leaf_one(record)
+        return compiled.leaf_interval(leaf)
+    except ValueError:
+        return None
+
+def _predict_records(current, records):
+    # Batch counterpart of _predict_one, used by the micro-batcher
+    current = current or model_state
+    predictions, misses = [None] * len(records), []
+    for i, record in enumerate(records):
+        cached = current.table.lookup(record) if current.table is not None else None
+        if cached is None:
+            misses.append(i)
+        else:
+            predictions[i] = cached
 
-        prediction = model.predict(input_df)
-        predicted_salary = float(prediction[0])
+    errors = {}
+    if misses:
+        columns = {name: [records[i][name] for i in misses] for name in FEATURE_COLUMNS}
+        scored, row_errors = _predict_columns(current, columns)
+        for i, value in zip(misses, scored):
+            predictions[i] = value
+        errors = {misses[j]: msg for j, msg in row_errors.items()}
+    return predictions, errors
+
+async def _run_micro_batch(records):
+    # Every row of a batch is scored by the same model version
+    current = model_state
+    predictions, errors = await _run_inference(_predict_records, current, records)
+    return [(value, current.version) for value in predictions], errors
+
+micro_batcher = None
+if BATCH_MAX_SIZE > 0:
+    micro_batcher = MicroBatcher(_run_micro_batch, max_batch_size=BATCH_MAX_SIZE,
+                                 max_wait_ms=BATCH_MAX_WAIT_MS)
+
+# Formats each kind of endpoint can answer with; the first is the default
+SINGLE_FORMATS = ("json", "msgpack")
+TABLE_FORMATS = ("json", "msgpack", "arrow", "ndjson")
+
+def _parse_body(model, formats=("json", "msgpack"), rows_field=None):
+    """Dependency decoding a request body in any of formats into model.
+
+    Replaces FastAPI's own body parsing: JSON goes straight to pydantic-core
+    (model_validate_json), other formats through wire_formats.decode. An
+    ndjson body is a list of rows and becomes model's rows_field.
+    """
+    async def parse(request: Request):
+        fmt = wire_formats.content_format(request.headers.get("content-type"))
+        if fmt not in formats or fmt not in wire_formats.AVAILABLE:
+            supported = [wire_formats.MEDIA_TYPES[f] for f in formats if f in wire_formats.AVAILABLE]
+            raise HTTPException(status_code=415, detail=f"Unsupported Content-Type, use one of: {', '.join(supported)}")
+        body = await request.body()
+        started = time.perf_counter()
+        try:
+            if fmt == "json":
+                # pydantic-core parses and validates in one pass: all of it counts as validate
+                return model.model_validate_json(body)
+            try:
+                data = wire_formats.decode(body, fmt)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Could not decode the {fmt} body: {e}")
+            if rows_field is not None and fmt == "ndjson":
+                data = {rows_field: data}
+            started = STAGE_SECONDS.observe_since(started, "decode")
+            return model.model_validate(data)
+        except ValidationError as e:
+            # Same 422 shape as FastAPI's own body validation
+            raise RequestValidationError(
+                [dict(err, loc=("body",) + tuple(err["loc"])) for err in e.errors(include_url=False)])
+        finally:
+            STAGE_SECONDS.observe_since(started, "validate")
+    return parse
+
+def _openapi_body(model, formats):
+    # The body is parsed by _parse_body, so describe it for /docs by hand
+    schema = model.model_json_schema()
+    content = {}
+    for fmt in formats:
+        if fmt in ("json", "msgpack"):
+            content[wire_formats.MEDIA_TYPES[fmt]] = {"schema": schema}
+        else:
+            content[wire_formats.MEDIA_TYPES[fmt]] = {"schema": {"type": "string", "format": "binary"}}
+    return {"requestBody": {"required": True, "content": content}}
+
+def _response_format(request, offered):
+    # Picked before any work is done so a bad Accept header fails fast
+    offered = [fmt for fmt in offered if fmt in wire_formats.AVAILABLE]
+    fmt = wire_formats.negotiate(request.headers.get("accept") if request is not None else None, offered)
+    if fmt is None:
+        acceptable = ", ".join(wire_formats.MEDIA_TYPES[f] for f in offered)
+        raise HTTPException(status_code=406, detail=f"Acceptable response types: {acceptable}")
+    return fmt
+
+def _respond(fmt, content, table=None, table_keys=()):
+    started = time.perf_counter()
+    body = wire_formats.encode(fmt, content, table, table_keys)
+    headers = {"Vary": "Accept"}
+    if fmt == "ndjson":
+        # Streamed chunk by chunk, large grids never sit in memory as one string
+        return StreamingResponse(body, media_type=wire_formats.MEDIA_TYPES[fmt], headers=headers)
+    STAGE_SECONDS.observe_since(started, "encode")
+    return Response(content=body, media_type=wire_formats.MEDIA_TYPES[fmt], headers=headers)
+
+@app.post("/predict", openapi_extra=_openapi_body(SalaryInput, SINGLE_FORMATS))
+async def predict_salary(user_input: SalaryInput = Depends(_parse_body(SalaryInput, SINGLE_FORMATS)),
+                         request: Request = None):
+    current = model_state
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    fmt = _response_format(request, SINGLE_FORMATS)
+    
+    try:
+        encoded, unknown_fields, normalized = None, [], {}
+        if current.canonical is not None:
+            # Known categories, aliases resolved; codes spare the compiled model a re-encode
+            input_data, codes, unknown_fields = current.canonical.canonicalize(user_input)
+            encoded = (current.version, codes)
+            normalized = {name: value for name, value in input_data.items()
+                          if value != getattr(user_input, name)}
+        else:
+            input_data = user_input.model_dump()
+
+        # Canonical values, so "F" and "FEMALE" share a cache entry
+        cache_key = (current.version,) + tuple(input_data[name] for name in FEATURE_COLUMNS)
+        started = time.perf_counter()
+        cached = prediction_cache.get(cache_key)
+        CACHE_LOOKUPS.inc("local", "miss" if cached is None else "hit")
+        if cached is None and shared_cache is not None:
+            # Another worker may have scored it already
+            cached = shared_cache.get(cache_key)
+            CACHE_LOOKUPS.inc("shared", "miss" if cached is None else "hit")
+            if cached is not None:
+                prediction_cache.put(cache_key, cached)
+        STAGE_SECONDS.observe_since(started, "cache_lookup")
+        version = current.version
+        if cached is None:
+            if micro_batcher is not None:
+                predicted_salary, version = await micro_batcher.predict(input_data)
+            else:
+                predicted_salary = await _run_inference(_predict_one, current, input_data, encoded)
+            interval = _prediction_interval(current, input_data, encoded) if version == current.version else None
+            prediction_cache.put((version,) + cache_key[1:], (predicted_salary, interval))
+            if shared_cache is not None:
+                shared_cache.put((version,) + cache_key[1:], (predicted_salary, interval))
+        else:
+            predicted_salary, interval = cached
         
-        logger.info(f"✅ Prediction successful: ${predicted_salary:,.2f}")
+        request_logger.info("✅ Prediction successful: $%.2f", predicted_salary,
+                            extra={"model_version": version})
         
-        return JSONResponse(
-            content={
-                "Estimated_Annual_Salary": predicted_salary,
-                "currency": "USD",
-                "message": "Prediction successful"
-            }, 
-            status_code=200
-        )
+        content = {
+            "Estimated_Annual_Salary": predicted_salary,
+            "interval": interval,
+            "currency": "USD",
+            "model_version": version,
+            # Values the model has never seen; the prediction falls back to its defaults for them
+            "unknown_fields": unknown_fields,
+            "message": "Prediction successful"
+        }
+        if normalized:
+            # Inputs that were rewritten to a known category (aliases, spacing)
+            content["normalized"] = normalized
+        return _respond(fmt, content)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Prediction error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
+def _predict_columns(current, columns):
+    """Score a batch (field -> list of values) in one vectorized call.
+
+    Returns (predictions, errors) where predictions is a list aligned with
+    the input rows (None for failed rows) and errors maps row position to
+    an error message. If the vectorized call fails, rows are re-scored one
+    by one so only the offending rows are reported.
+    """
+    current = current or model_state
+    try:
+        started = time.perf_counter()
+        if current.compiled is not None:
+            predictions = current.compiled.predict_columns(columns).tolist()
+            STAGE_SECONDS.observe_since(started, "compiled")
+            return predictions, {}
+        import pandas as pd
+        input_df = pd.DataFrame(columns, columns=FEATURE_COLUMNS)
+        started = STAGE_SECONDS.observe_since(started, "dataframe")
+        return [float(p) for p in _predict_frame(current, input_df, started)], {}
+    except Exception as e:
+        logger.warning(f"Batch prediction failed, retrying row by row: {e}")
+
+    predictions, errors = [], {}
+    for i in range(len(columns[FEATURE_COLUMNS[0]])):
+        try:
+            record = {name: columns[name][i] for name in FEATURE_COLUMNS}
+            predictions.append(_score_record(current, record))
+        except Exception as e:
+            predictions.append(None)
+            errors[i] = str(e)
+    return predictions, errors
+
+
+def _canonicalize_columns(current, columns):
+    """Resolve aliases column by column; returns (columns, row -> unknown fields)."""
+    if current.canonical is None:
+        return columns, {}
+    unknown = {}
+    for name in FEATURE_COLUMNS:
+        columns[name], positions = current.canonical.canonicalize_column(name, columns[name])
+        for i in positions:
+            unknown.setdefault(i, []).append(name)
+    return columns, unknown
+
+
+def _batch_response(fmt, predictions, errors, version, unknown=None):
+    content = {
+        "Estimated_Annual_Salaries": predictions,
+        "errors": [{"index": i, "error": msg} for i, msg in sorted(errors.items())],
+        "unknown_fields": [{"index": i, "fields": fields} for i, fields in sorted((unknown or {}).items())],
+        "count": len(predictions),
+        "currency": "USD",
+        "model_version": version,
+        "message": "Prediction successful" if not errors else "Prediction completed with errors"
+    }
+    # Arrow/NDJSON: one row per input row, in input order
+    return _respond(fmt, content, table={"Estimated_Annual_Salary": predictions},
+                    table_keys=("Estimated_Annual_Salaries",))
+
+
+BATCH_FORMATS = ("json", "msgpack", "ndjson")
+
+@app.post("/predict/batch", openapi_extra=_openapi_body(SalaryBatchInput, BATCH_FORMATS))
+async def predict_salary_batch(batch: SalaryBatchInput = Depends(_parse_body(SalaryBatchInput, BATCH_FORMATS,
+                                                                             rows_field="records")),
+                               request: Request = None):
+    current = model_state
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    fmt = _response_format(request, TABLE_FORMATS)
+
+    # Validate each record on its own and keep track of where it came from
+    started = time.perf_counter()
+    rows, positions, errors = [], [], {}
+    for i, record in enumerate(batch.records):
+        try:
+            rows.append(SalaryInput.model_validate(record).model_dump())
+            positions.append(i)
+        except ValidationError as e:
+            errors[i] = "Invalid input: " + "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+            )
+    STAGE_SECONDS.observe_since(started, "validate")
+
+    predictions, unknown = [None] * len(batch.records), {}
+    if rows:
+        columns = {name: [row[name] for row in rows] for name in FEATURE_COLUMNS}
+        columns, row_unknown = _canonicalize_columns(current, columns)
+        unknown = {positions[j]: fields for j, fields in row_unknown.items()}
+        scored, row_errors = await _run_inference(_predict_columns, current, columns)
+        for pos, value in zip(positions, scored):
+            predictions[pos] = value
+        for j, msg in row_errors.items():
+            errors[positions[j]] = f"Prediction error: {msg}"
+
+    ROW_ERRORS.inc("/predict/batch", amount=len(errors))
+    request_logger.info("✅ Batch prediction: %d rows, %d errors", len(batch.records), len(errors))
+    return _batch_response(fmt, predictions, errors, current.version, unknown)
+
+
+COLUMNAR_FORMATS = ("json", "msgpack", "arrow")
+
+@app.post("/predict/batch/columnar", openapi_extra=_openapi_body(SalaryColumnarInput, COLUMNAR_FORMATS))
+async def predict_salary_columnar(batch: SalaryColumnarInput = Depends(_parse_body(SalaryColumnarInput,
+                                                                                   COLUMNAR_FORMATS)),
+                                  request: Request = None):
+    current = model_state
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    fmt = _response_format(request, TABLE_FORMATS)
+
+    # Same upper-casing as SalaryInput, once per distinct value
+    columns = {}
+    for name in FEATURE_COLUMNS:
+        values = getattr(batch, name)
+        upper = {v: v.upper() for v in set(values)}
+        columns[name] = list(map(upper.__getitem__, values))
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=422, detail="All columns must have the same length")
+    columns, unknown = _canonicalize_columns(current, columns)
+
+    predictions, errors = await _run_inference(_predict_columns, current, columns)
+    errors = {i: f"Prediction error: {msg}" for i, msg in errors.items()}
+
+    ROW_ERRORS.inc("/predict/batch/columnar", amount=len(errors))
+    request_logger.info("✅ Columnar batch prediction: %d rows, %d errors", len(predictions), len(errors))
+    return _batch_response(fmt, predictions, errors, current.version, unknown)
+
+
+
+def _grid_dimensions(current, grid):
+    """field -> list of values for a SalaryGridInput, with "ALL" expanded.
+
+    Returns (dimensions, field -> values the model doesn't know).
+    """
+    dimensions, unknown = {}, {}
+    for name in FEATURE_COLUMNS:
+        value = getattr(grid, name)
+        if value == GRID_ALL:
+            index = current.suggest.get(name)
+            if index is None:
+                raise HTTPException(status_code=422, detail=f"Known values of {name} are not available")
+            value = index.values
+        else:
+            if isinstance(value, str):
+                value = [value]
+            if current.canonical is not None:
+                value, positions = current.canonical.canonicalize_column(name, value)
+                if positions:
+                    unknown[name] = list(dict.fromkeys(value[i] for i in positions))
+                # Aliases can collapse onto the same category; keep the first
+                value = list(dict.fromkeys(value))
+        if not value:
+            raise HTTPException(status_code=422, detail=f"{name} must not be empty")
+        dimensions[name] = value
+    return dimensions, unknown
+
+
+def _score_grid(current, dimensions):
+    """Score the row-major cartesian product of the dimensions in one pass.
+
+    Returns a float64 array. There is no row-by-row fallback: a value the model
+    rejects would fail every row it appears in, up to GRID_MAX_ROWS of them, so
+    the error is raised instead (the endpoint checks the values up front).
+    """
+    current = current or model_state
+    started = time.perf_counter()
+    shape = [len(dimensions[name]) for name in FEATURE_COLUMNS]
+    index = np.indices(shape, dtype=np.intp).reshape(len(shape), -1)
+    if current.compiled is not None:
+        # Encode each dimension once, then expand the codes
+        codes = {name: current.compiled.encode_column(name, dimensions[name])[index[k]]
+                 for k, name in enumerate(FEATURE_COLUMNS)}
+        predictions = current.compiled.predict_codes(codes).astype(np.float64)
+    else:
+        import pandas as pd
+        frame = pd.DataFrame({name: np.asarray(dimensions[name], dtype=object)[index[k]]
+                              for k, name in enumerate(FEATURE_COLUMNS)}, columns=FEATURE_COLUMNS)
+        predictions = np.asarray(_predict_frame(current, frame, time.perf_counter()), dtype=np.float64)
+    STAGE_SECONDS.observe_since(started, "grid")
+    return predictions
+
+
+@app.post("/predict/grid", openapi_extra=_openapi_body(SalaryGridInput, SINGLE_FORMATS))
+async def predict_salary_grid(grid: SalaryGridInput = Depends(_parse_body(SalaryGridInput)),
+                              request: Request = None):
+    current = model_state
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    fmt = _response_format(request, TABLE_FORMATS)
+
+    dimensions, unknown = _grid_dimensions(current, grid)
+    total = math.prod(len(values) for values in dimensions.values())
+    if total > GRID_MAX_ROWS:
+        raise HTTPException(status_code=422,
+                            detail=f"Grid has {total:,} rows, the limit is {GRID_MAX_ROWS:,}")
+    if grid.offset > total:
+        raise HTTPException(status_code=422, detail=f"offset {grid.offset:,} is past the last row ({total:,})")
+    if current.compiled is not None:
+        # Catch values the model rejects before scoring a whole grid of them
+        for name in FEATURE_COLUMNS:
+            try:
+                current.compiled.encode_column(name, dimensions[name])
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+
+    cache_key = (current.version,) + tuple(tuple(dimensions[name]) for name in FEATURE_COLUMNS)
+    predictions = grid_cache.get(cache_key)
+    if predictions is None:
+        try:
+            predictions = await _run_inference(_score_grid, current, dimensions)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Could not score the grid: {e}")
+        grid_cache.put(cache_key, predictions)
+
+    start, stop = grid.offset, min(grid.offset + grid.limit, total)
+    page = predictions[start:stop]
+    # NaN isn't valid JSON, a NaN prediction comes back as null
+    page = [None if math.isnan(p) else p for p in page.tolist()] if np.isnan(page).any() else page.tolist()
+    content = {
+        "dimensions": dimensions,
+        "order": FEATURE_COLUMNS,
+        "total_rows": total,
+        "offset": start,
+        "limit": grid.limit,
+        "next_offset": stop if stop < total else None,
+        "Estimated_Annual_Salaries": page,
+        "unknown_fields": unknown,
+        "currency": "USD",
+        "model_version": current.version,
+    }
+    if grid.include_columns:
+        # Row i of the grid is the row-major unravelling of i over the dimensions
+        varying = [name for name in FEATURE_COLUMNS if len(dimensions[name]) > 1]
+        columns = {name: [] for name in varying}
+        strides, stride = {}, 1
+        for name in reversed(FEATURE_COLUMNS):
+            strides[name] = stride
+            stride *= len(dimensions[name])
+        for name in varying:
+            values, step = dimensions[name], strides[name]
+            columns[name] = [values[(i // step) % len(values)] for i in range(start, stop)]
+        content["columns"] = columns
+
+    request_logger.info("✅ Grid prediction: %d rows, returned %d", total, stop - start)
+    # Arrow/NDJSON rows: the varying dimensions plus the prediction
+    table = dict(content.get("columns", {}), Estimated_Annual_Salary=page)
+    return _respond(fmt, content, table=table, table_keys=("Estimated_Annual_Salaries", "columns"))
+
+# Load the model last: the canary prediction needs the helpers above
+load_model()
\ No newline at end of file
@@ -0,0 +1,177 @@
+# score_csv.py
+"""Stream-score salary exports that don't fit in memory.
+
+    python score_csv.py salary.csv scored.csv
+    python score_csv.py history.parquet scored.parquet --model model_simple.npz --jobs 4
+
+The input is read in chunks (CSV via pandas, Parquet via pyarrow row batches),
+the raw `AGENCY NAME` / `CLASS TITLE` / ... headers are mapped onto the
+SalaryInput fields and every chunk is scored with one vectorized call. Each
+scored chunk is appended to the output straight away, so memory stays flat
+regardless of input size. --jobs N scores chunks on a process pool while
+keeping the output in input order.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from compiled_model import CompiledEnsemble, CompiledPredictor, FEATURE_COLUMNS, compile_pipeline, load_compiled
+from lookup_table import RAW_COLUMNS
+
+COMPILED = (CompiledPredictor, CompiledEnsemble)
+
+_predictor = None
+
+
+def load_predictor(model_path, compiled=False):
+    if model_path.endswith(".npz"):
+        return load_compiled(model_path)
+    import joblib
+    model = joblib.load(model_path)
+    return compile_pipeline(model) if compiled else model
+
+
+def _init_worker(model_path, compiled):
+    global _predictor
+    _predictor = load_predictor(model_path, compiled)
+
+
+def feature_columns(chunk):
+    """Map raw or SalaryInput headers to SalaryInput fields, upper-cased."""
+    renamed = chunk.rename(columns=RAW_COLUMNS)
+    missing = [f for f in FEATURE_COLUMNS if f not in renamed.columns]
+    if missing:
+        raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+    return {f: _upper(renamed[f]) for f in FEATURE_COLUMNS}
+
+
+def _upper(column):
+    # Same upper-casing as SalaryInput. Missing values stay NaN so the model imputes
+    # them; astype(str) would turn them into "NAN" / "NONE" categories
+    present = column.notna().to_numpy()
+    values = np.full(len(column), np.nan, dtype=object)
+    values[present] = column[present].astype(str).str.upper().to_numpy()
+    return values.tolist()
+
+
+def score_chunk(chunk, predictor=None):
+    predictor = predictor or _predictor
+    columns = feature_columns(chunk)
+    try:
+        if isinstance(predictor, COMPILED):
+            return predictor.predict_columns(columns)
+        return np.asarray(predictor.predict(pd.DataFrame(columns, columns=FEATURE_COLUMNS)), dtype=np.float64)
+    except Exception:
+        pass
+
+    # Isolate the bad rows; they get NaN instead of failing the whole export
+    out = np.full(len(chunk), np.nan)
+    for i in range(len(chunk)):
+        record = {f: columns[f][i] for f in FEATURE_COLUMNS}
+        try:
+            if isinstance(predictor, COMPILED):
+                out[i] = predictor.predict_one(record)
+            else:
+                out[i] = predictor.predict(pd.DataFrame([record], columns=FEATURE_COLUMNS))[0]
+        except Exception:
+            pass
+    return out
+
+
+def read_chunks(path, chunk_size):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str)
+
+
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, frame):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def score_file(input_path, output_path, model_path="model_simple.pkl", chunk_size=100_000,
+               jobs=1, compiled=False, prediction_column="PREDICTED_ANNUAL", keep_columns=True):
+    writer = ChunkWriter(output_path)
+    rows = failed = 0
+
+    def emit(chunk, predictions):
+        nonlocal rows, failed
+        out = chunk if keep_columns else pd.DataFrame(index=chunk.index)
+        out = out.assign(**{prediction_column: predictions})
+        writer.write(out)
+        rows += len(chunk)
+        failed += int(np.isnan(predictions).sum())
+
+    try:
+        if jobs <= 1:
+            predictor = load_predictor(model_path, compiled)
+            for chunk in read_chunks(input_path, chunk_size):
+                emit(chunk, score_chunk(chunk, predictor))
+        else:
+            # Bounded window of in-flight chunks keeps memory constant and order intact
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(model_path, compiled)) as pool:
+                pending = []
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append((chunk, pool.submit(score_chunk, chunk)))
+                    if len(pending) >= 2 * jobs:
+                        done_chunk, future = pending.pop(0)
+                        emit(done_chunk, future.result())
+                for done_chunk, future in pending:
+                    emit(done_chunk, future.result())
+    finally:
+        writer.close()
+    return rows, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream-score a salary CSV/Parquet export")
+    parser.add_argument("input", help="input .csv or .parquet")
+    parser.add_argument("output", help="output .csv or .parquet")
+    parser.add_argument("--model", default="model_simple.pkl", help="model_simple.pkl or a .npz artifact")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--jobs", type=int, default=1, help="score chunks on N processes")
+    parser.add_argument("--compiled", action="store_true", help="compile the pickle before scoring")
+    parser.add_argument("--prediction-column", default="PREDICTED_ANNUAL")
+    parser.add_argument("--predictions-only", action="store_true", help="don't copy the input columns")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"{args.input} does not exist")
+    started = time.perf_counter()
+    rows, failed = score_file(args.input, args.output, args.model, args.chunk_size, args.jobs,
+                              args.compiled, args.prediction_column, not args.predictions_only)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {rows:,} rows ({failed:,} failed) in {elapsed:.1f}s "
+          f"({rows / elapsed if elapsed else 0:,.0f} rows/s) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# serve.py
+"""Pre-fork multi-worker server.
+
+The parent imports main (and so loads model_simple.pkl) once, binds the listen
+socket and then forks the uvicorn workers. Workers share the model's memory
+pages copy-on-write instead of each deserializing their own copy.
+
+    python serve.py --workers 4 --port 8000 [--mmap]
+
+--mmap loads the model with joblib's mmap_mode="r" so the numpy arrays inside
+it are backed by the page cache and stay shared even if a worker is restarted.
+Per-worker memory is logged at startup and served at /worker.
+
+SIGHUP to the parent (or POST /admin/reload to any worker) reloads the model
+in every worker, and in the parent so restarted workers fork the new one.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+logger = logging.getLogger("serve")
+
+
+def process_memory(pid="self"):
+    """RSS / PSS / shared / private memory of a process in MB (Linux)."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        import resource
+        return {"rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "shared_mb": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def _run_worker(app, sock, args):
+    import uvicorn
+
+    config = uvicorn.Config(app, log_level=args.log_level, access_log=False)
+    server = uvicorn.Server(config)
+    logger.info(f"👷 Worker {os.getpid()} serving, memory: {process_memory()}")
+    server.run(sockets=[sock])
+
+
+def _reload_in_background(api):
+    # Signal handlers run on the event loop's thread: load beside it
+    threading.Thread(target=api.load_model, name="model-reload", daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-fork server for the salary API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mmap", action="store_true", help="memory-map model arrays")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.mmap:
+        os.environ["SALARY_MODEL_MMAP"] = "1"
+
+    started = time.perf_counter()
+    import main as api
+    if api.model_state is None:
+        logger.error("❌ Model failed to load, not starting workers")
+        return 1
+    load_seconds = time.perf_counter() - started
+    logger.info(f"✅ Parent loaded the app in {load_seconds:.2f}s, memory: {process_memory()}")
+
+    @api.app.get("/worker")
+    def worker_info():
+        return {"pid": os.getpid(), "startup_seconds": load_seconds, "memory": process_memory()}
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Move everything allocated so far out of the GC's reach so collections in
+    # the workers don't write to (and un-share) the model's pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, lambda signum, frame: _reload_in_background(api))
+            api.reload_broadcast = lambda: os.kill(os.getppid(), signal.SIGHUP)
+            try:
+                _run_worker(api.app, sock, args)
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reload(signum, frame):
+        logger.info(f"🔄 Reloading the model in {len(children)} workers")
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGHUP)
+            except ProcessLookupError:
+                pass
+        if api.load_model():
+            gc.collect()
+            gc.freeze()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, reload)
+
+    for _ in range(args.workers):
+        spawn()
+    logger.info(f"🚀 {args.workers} workers on http://{args.host}:{args.port} "
+                f"({time.perf_counter() - started:.2f}s after start)")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.pop(pid, None)
+        if not stopping:
+            logger.warning(f"⚠️ Worker {pid} exited with status {status}, restarting")
+            spawn()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# shared_cache.py
+"""Prediction cache shared by every worker process on a host.
+
+    SALARY_SHARED_CACHE_PATH=/dev/shm/salary_cache python serve.py --workers 4
+
+Each worker's PredictionCache only sees its own traffic, so adding workers
+splits the hits between them. SharedCache is a second tier behind it: a
+fixed-size hash table in a memory-mapped file that all processes opening the
+same path (forked by serve.py or started separately) read and write.
+
+    header   magic, slot count
+    buckets  8 slots each; a key only ever lives in the bucket its hash picks
+    slot     128-bit key hash, expiry, last use, salary and the optional interval
+
+A bucket is locked (fcntl range lock, so across processes) while it is read
+or written. A full bucket evicts its least recently used entry, so memory
+stays at the size the file was created with. Errors never fail a request:
+they count as a miss and the caller computes the prediction itself.
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+MAGIC = b"SALCACH1"
+_HEADER = struct.Struct("<8sQ")
+HEADER_BYTES = 64
+# key hash, expires_at, last_used, salary, lower, upper, median, level, support, flags
+_SLOT = struct.Struct("<16sdddddddqB7x")
+SLOT_BYTES = _SLOT.size
+BUCKET_SLOTS = 8
+BUCKET_BYTES = SLOT_BYTES * BUCKET_SLOTS
+
+_EMPTY = bytes(16)
+_HAS_INTERVAL, _HAS_MEDIAN = 1, 2
+
+
+def key_hash(key):
+    """128-bit hash of a cache key (a tuple of strings)."""
+    return hashlib.blake2b("\x1f".join(map(str, key)).encode("utf-8"), digest_size=16).digest()
+
+
+class SharedCache:
+    def __init__(self, path, slots=65536, ttl=3600.0, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        # Wall clock: expiry times are compared across processes
+        self._clock = clock
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.buckets = self._init_file(max(1, math.ceil(slots / BUCKET_SLOTS)))
+        self.slots = self.buckets * BUCKET_SLOTS
+        self._size = HEADER_BYTES + self.buckets * BUCKET_BYTES
+        self._mm = mmap.mmap(self._fd, self._size)
+        # fcntl locks belong to the process; threads also need to exclude each other
+        self._thread_lock = threading.Lock()
+        # Per process, like PredictionCache's counters
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _init_file(self, buckets):
+        """Number of buckets in the table, creating it if the file is new."""
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, HEADER_BYTES, 0)
+        try:
+            header = os.pread(self._fd, _HEADER.size, 0)
+            if len(header) == _HEADER.size:
+                magic, slots = _HEADER.unpack(header)
+                size = HEADER_BYTES + slots * SLOT_BYTES
+                if magic == MAGIC and slots % BUCKET_SLOTS == 0 and os.fstat(self._fd).st_size == size:
+                    # Another worker made it: use it as is, whatever slots it was asked for.
+                    # Resizing would pull the pages out from under processes that have it mapped.
+                    return slots // BUCKET_SLOTS
+            os.ftruncate(self._fd, HEADER_BYTES + buckets * BUCKET_BYTES)
+            os.pwrite(self._fd, _HEADER.pack(MAGIC, buckets * BUCKET_SLOTS), 0)
+            return buckets
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, HEADER_BYTES, 0)
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+    @contextmanager
+    def _bucket(self, digest):
+        bucket = int.from_bytes(digest[:8], "little") % self.buckets
+        offset = HEADER_BYTES + bucket * BUCKET_BYTES
+        with self._thread_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, BUCKET_BYTES, offset)
+            try:
+                yield offset
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, BUCKET_BYTES, offset)
+
+    def get(self, key):
+        """(salary, interval) for key, or None on a miss."""
+        digest = key_hash(key)
+        try:
+            with self._bucket(digest) as offset:
+                now = self._clock()
+                for slot in range(offset, offset + BUCKET_BYTES, SLOT_BYTES):
+                    if self._mm[slot:slot + 16] != digest:
+                        continue
+                    (_, expires_at, _, salary, lower, upper, median, level,
+                     support, flags) = _SLOT.unpack_from(self._mm, slot)
+                    if expires_at and expires_at <= now:
+                        self._mm[slot:slot + 16] = _EMPTY
+                        self.expirations += 1
+                        break
+                    struct.pack_into("<d", self._mm, slot + 24, now)
+                    self.hits += 1
+                    return salary, _interval(lower, upper, median, level, support, flags)
+        except (OSError, ValueError):
+            self.errors += 1
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        salary, interval = value
+        digest = key_hash(key)
+        try:
+            with self._bucket(digest) as offset:
+                now = self._clock()
+                target, oldest = None, None
+                for slot in range(offset, offset + BUCKET_BYTES, SLOT_BYTES):
+                    stored = self._mm[slot:slot + 16]
+                    if stored == digest or stored == _EMPTY:
+                        target = slot
+                        break
+                    expires_at, last_used = struct.unpack_from("<dd", self._mm, slot + 16)
+                    if expires_at and expires_at <= now:
+                        target = slot
+                        break
+                    if oldest is None or last_used < oldest[0]:
+                        oldest = (last_used, slot)
+                if target is None:
+                    target = oldest[1]
+                    self.evictions += 1
+                expires_at = now + self.ttl if self.ttl else 0.0
+                _SLOT.pack_into(self._mm, target, digest, expires_at, now, salary, *_interval_fields(interval))
+        except (OSError, ValueError):
+            self.errors += 1
+
+    def entries(self):
+        """Live entries across all processes (an unlocked scan, so approximate)."""
+        import numpy as np
+
+        table = np.frombuffer(self._mm, dtype=np.uint8, offset=HEADER_BYTES).reshape(self.slots, SLOT_BYTES)
+        used = table[:, :16].any(axis=1)
+        expires_at = table[:, 16:24].copy().view("<f8").ravel()
+        count = int((used & ((expires_at == 0) | (expires_at > self._clock()))).sum())
+        del table  # release the buffer, or the mmap can't be closed
+        return count
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "size": self.entries(),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "errors": self.errors,
+        }
+
+
+def _interval_fields(interval):
+    if interval is None:
+        return 0.0, 0.0, 0.0, 0.0, 0, 0
+    flags = _HAS_INTERVAL | (_HAS_MEDIAN if "median" in interval else 0)
+    return (interval["lower"], interval["upper"], interval.get("median", 0.0),
+            interval["level"], interval["support"], flags)
+
+
+def _interval(lower, upper, median, level, support, flags):
+    # Same dict (and key order) as CompiledPredictor.leaf_interval
+    if not flags & _HAS_INTERVAL:
+        return None
+    interval = {"lower": lower, "upper": upper, "level": level}
+    if flags & _HAS_MEDIAN:
+        interval["median"] = median
+    interval["support"] = support
+    return interval
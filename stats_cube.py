@@ -0,0 +1,165 @@
+# stats_cube.py
+"""Observed pay statistics cube built offline from salary.csv.
+
+    python stats_cube.py salary.csv salary_stats.npz
+
+For every combination of agency, class title, status, gender and ethnicity
+that occurs in the data, and for every rollup where any of those dimensions is
+left out ("all agencies", "all genders", ...), the cube stores the count, mean,
+min, max and the 10/25/50/75/90th percentiles of ANNUAL.
+
+Cells are addressed by a mixed-radix integer key (code + 1 per dimension, 0 for
+a rolled-up dimension) kept in a sorted array, so a lookup is a few dict gets
+and one binary search. Serve it with SALARY_STATS_CUBE=salary_stats.npz.
+"""
+import sys
+import time
+
+import numpy as np
+
+from compiled_model import FEATURE_COLUMNS
+
+DIMENSIONS = FEATURE_COLUMNS
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+STAT_NAMES = ["mean", "min", "p10", "p25", "median", "p75", "p90", "max"]
+# Dimensions dropped one by one when a cell has too few employees to be useful
+FALLBACK_ORDER = ["ETHNICITY", "GENDER", "STATUS", "AGENCY_NAME"]
+# Value meaning "rolled up" in lookups
+ALL = "ALL"
+
+
+def _multipliers(sizes):
+    multipliers, m = [], 1
+    for size in sizes:
+        multipliers.append(m)
+        m *= size + 1
+    if m >= 2 ** 63:
+        raise ValueError("Too many categories for a 64-bit cube key")
+    return multipliers
+
+
+def build(data_path, out_path, target="ANNUAL"):
+    import pandas as pd
+    import ingest
+
+    frame = ingest.load_salary_data(data_path, columns=DIMENSIONS + [target])
+    values = np.asarray(frame[target], dtype=np.float64)
+    codes = {d: np.asarray(frame[d].cat.codes, dtype=np.int64) for d in DIMENSIONS}
+    vocabularies = {d: [str(c) for c in frame[d].cat.categories] for d in DIMENSIONS}
+
+    keep = ~np.isnan(values)
+    for d in DIMENSIONS:
+        keep &= codes[d] >= 0
+    values = values[keep]
+    codes = {d: c[keep] for d, c in codes.items()}
+
+    multipliers = _multipliers([len(vocabularies[d]) for d in DIMENSIONS])
+    parts = []
+    # Every subset of the dimensions, from the full cube down to the grand total
+    for mask in range(2 ** len(DIMENSIONS)):
+        key = np.zeros(len(values), dtype=np.int64)
+        for bit, (d, m) in enumerate(zip(DIMENSIONS, multipliers)):
+            if mask & (1 << bit):
+                key += (codes[d] + 1) * m
+        grouped = pd.Series(values).groupby(key)
+        stats = grouped.agg(["count", "mean", "min", "max"])
+        quantiles = grouped.quantile(list(QUANTILES)).unstack()
+        stats[["p10", "p25", "median", "p75", "p90"]] = quantiles.to_numpy()
+        parts.append(stats)
+
+    cube = pd.concat(parts).sort_index()
+    np.savez(
+        out_path,
+        dimensions=np.array(DIMENSIONS),
+        target=np.array(target),
+        keys=cube.index.to_numpy(dtype=np.int64),
+        counts=cube["count"].to_numpy(dtype=np.int32),
+        stats=cube[STAT_NAMES].to_numpy(dtype=np.float32),
+        **{f"vocab__{d}": np.array(vocabularies[d], dtype=str) for d in DIMENSIONS},
+    )
+    return len(cube)
+
+
+class StatsCube:
+    def __init__(self, dimensions, vocabularies, keys, counts, stats, target="ANNUAL"):
+        self.dimensions = list(dimensions)
+        self.vocabularies = vocabularies
+        self.codes = {d: {v: i for i, v in enumerate(vocabularies[d])} for d in self.dimensions}
+        self.multipliers = _multipliers([len(vocabularies[d]) for d in self.dimensions])
+        self.keys = keys
+        self.counts = counts
+        self.stats = stats
+        self.target = target
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            dimensions = data["dimensions"].tolist()
+            return cls(
+                dimensions,
+                vocabularies={d: data[f"vocab__{d}"].tolist() for d in dimensions},
+                keys=data["keys"],
+                counts=data["counts"],
+                stats=data["stats"],
+                target=str(data["target"]),
+            )
+
+    def key(self, record):
+        """Cube key for a field -> value mapping; missing fields or ALL roll up."""
+        key = 0
+        for d, m in zip(self.dimensions, self.multipliers):
+            value = record.get(d)
+            if value is None or value == ALL:
+                continue
+            code = self.codes[d].get(value)
+            if code is None:
+                return None
+            key += (code + 1) * m
+        return key
+
+    def lookup(self, record):
+        """Stats for one cell as a dict, or None if no employee matches."""
+        key = self.key(record)
+        if key is None:
+            return None
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        cell = {"count": int(self.counts[i])}
+        cell.update((name, round(v, 2)) for name, v in zip(STAT_NAMES, self.stats[i].tolist()))
+        return cell
+
+    def lookup_with_fallback(self, record, min_count=1):
+        """Most specific cell with at least min_count employees.
+
+        Drops ethnicity, gender, status and then agency until one qualifies.
+        Returns (filters used, cell) or (None, None).
+        """
+        filters = {d: record[d] for d in self.dimensions if record.get(d) not in (None, ALL)}
+        for drop in [None] + FALLBACK_ORDER:
+            filters.pop(drop, None)
+            cell = self.lookup(filters)
+            if cell is not None and cell["count"] >= min_count:
+                return dict(filters), cell
+        return None, None
+
+    def summary(self):
+        """Grand total plus the number of distinct values per dimension."""
+        return {
+            "target": self.target,
+            "overall": self.lookup({}),
+            "distinct": {d: len(self.vocabularies[d]) for d in self.dimensions},
+            "cells": len(self),
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python stats_cube.py salary.csv salary_stats.npz")
+        sys.exit(2)
+    started = time.perf_counter()
+    cells = build(sys.argv[1], sys.argv[2])
+    print(f"Wrote {cells:,} cells to {sys.argv[2]} in {time.perf_counter() - started:.1f}s")
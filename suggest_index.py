@@ -0,0 +1,105 @@
+# suggest_index.py
+"""In-memory prefix + fuzzy index over the model's known categories.
+
+Built once per model load. A query is matched, in order of preference, as:
+
+    exact        the canonical value itself
+    prefix       value starts with the query          ("CORREC OFF" -> "CORREC OFFICER IV")
+    word prefix  some word of the value starts with it ("OFFICER IV" -> "CORREC OFFICER IV")
+    fuzzy        shares enough character trigrams     ("CORRECTIONAL OFFICER IV" -> "CORREC OFFICER IV")
+
+Prefix lookups are a bisect over sorted word suffixes; fuzzy candidates come
+from a trigram inverted index and are re-ranked with difflib.
+"""
+import bisect
+import difflib
+from collections import Counter, defaultdict
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestIndex:
+    def __init__(self, values):
+        self.values = sorted({str(v) for v in values})
+        self._exact = set(self.values)
+
+        # (suffix starting at a word boundary, value id), sorted for bisect
+        suffixes = []
+        for i, value in enumerate(self.values):
+            start = 0
+            for word in value.split(" "):
+                if word:
+                    suffixes.append((value[start:], i))
+                start += len(word) + 1
+        suffixes.sort()
+        self._suffix_keys = [s for s, _ in suffixes]
+        self._suffix_ids = [i for _, i in suffixes]
+
+        self._trigram_ids = defaultdict(list)
+        self._trigram_counts = []
+        for i, value in enumerate(self.values):
+            grams = _trigrams(value)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._trigram_ids[gram].append(i)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self._exact
+
+    def _word_prefix(self, query, limit):
+        lo = bisect.bisect_left(self._suffix_keys, query)
+        hits, seen = [], set()
+        for pos in range(lo, len(self._suffix_keys)):
+            if not self._suffix_keys[pos].startswith(query):
+                break
+            i = self._suffix_ids[pos]
+            if i not in seen:
+                seen.add(i)
+                hits.append(i)
+        # Whole-value prefixes first, then shorter (more specific) values
+        hits.sort(key=lambda i: (not self.values[i].startswith(query), len(self.values[i]), self.values[i]))
+        return hits[:limit]
+
+    def _fuzzy(self, query, limit, min_score):
+        grams = _trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            for i in self._trigram_ids.get(gram, ()):
+                shared[i] += 1
+        # Dice coefficient on trigrams to shortlist, difflib ratio to rank
+        shortlist = sorted(shared, key=lambda i: -2 * shared[i] / (len(grams) + self._trigram_counts[i]))
+        scored = []
+        for i in shortlist[:max(limit * 5, 25)]:
+            score = difflib.SequenceMatcher(None, query, self.values[i]).ratio()
+            if score >= min_score:
+                scored.append((score, i))
+        scored.sort(key=lambda item: (-item[0], self.values[item[1]]))
+        return scored[:limit]
+
+    def suggest(self, query, limit=10, min_score=0.6):
+        """Return up to `limit` dicts with value, score and match kind."""
+        query = " ".join(str(query).upper().split())
+        if not query:
+            return []
+        results, seen = [], set()
+
+        def add(i, score, kind):
+            if i not in seen and len(results) < limit:
+                seen.add(i)
+                results.append({"value": self.values[i], "score": round(score, 3), "match": kind})
+
+        if query in self._exact:
+            add(bisect.bisect_left(self.values, query), 1.0, "exact")
+        for i in self._word_prefix(query, limit):
+            kind = "prefix" if self.values[i].startswith(query) else "word_prefix"
+            add(i, len(query) / len(self.values[i]), kind)
+        if len(results) < limit:
+            for score, i in self._fuzzy(query, limit, min_score):
+                add(i, score, "fuzzy")
+        return results
@@ -0,0 +1,47 @@
+# tests/conftest.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiled_model import FEATURE_COLUMNS  # noqa: E402
+from train import build_pipeline  # noqa: E402
+
+CHOICES = {
+    "AGENCY_NAME": [f"AGENCY {i}" for i in range(12)],
+    "CLASS_TITLE": [f"TITLE {i}" for i in range(30)],
+    "ETHNICITY": ["WHITE", "HISPANIC", "BLACK", "ASIAN", "OTHER"],
+    "GENDER": ["FEMALE", "MALE"],
+    "STATUS": ["CRF - CLASSIFIED REGULAR FULL-TIME", "URP - UNCLASSIFIED REGULAR PART-TIME"],
+}
+
+
+def salary_frame(n_rows=600, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({f: rng.choice(CHOICES[f], n_rows) for f in FEATURE_COLUMNS})
+    codes = {f: X[f].map({v: i for i, v in enumerate(CHOICES[f])}).to_numpy() for f in FEATURE_COLUMNS}
+    y = (30000 + 2500 * codes["CLASS_TITLE"] + 1500 * codes["AGENCY_NAME"]
+         + 4000 * codes["GENDER"] - 20000 * codes["STATUS"] + rng.normal(0, 2000, n_rows))
+    return X, y
+
+
+@pytest.fixture(scope="session")
+def data():
+    return salary_frame()
+
+
+@pytest.fixture(scope="session")
+def tree_model(data):
+    X, y = data
+    return build_pipeline({"max_depth": 8, "min_samples_leaf": 3}).fit(X, y)
+
+
+@pytest.fixture(scope="session")
+def hgb_model(data):
+    X, y = data
+    return build_pipeline({"max_iter": 30, "min_samples_leaf": 5}, model="hgb").fit(X, y)
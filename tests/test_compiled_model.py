@@ -0,0 +1,57 @@
+# tests/test_compiled_model.py
+"""Compiled predictors must match model.predict on small fitted pipelines."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled_model import (
+    CompiledEnsemble,
+    CompiledPredictor,
+    FEATURE_COLUMNS,
+    check_parity,
+    compile_pipeline,
+    load_compiled,
+)
+
+TOLERANCE = 1e-6
+
+
+def test_tree_parity(tree_model):
+    compiled = compile_pipeline(tree_model)
+    assert isinstance(compiled, CompiledPredictor)
+    assert check_parity(tree_model, compiled, n_rows=2000) <= TOLERANCE
+
+
+def test_ensemble_parity(hgb_model):
+    compiled = compile_pipeline(hgb_model)
+    assert isinstance(compiled, CompiledEnsemble)
+    assert check_parity(hgb_model, compiled, n_rows=2000) <= TOLERANCE
+
+
+def test_ensemble_walk_parity(hgb_model):
+    # max_cells=0: no tables, every tree is walked
+    compiled = compile_pipeline(hgb_model, max_cells=0)
+    assert check_parity(hgb_model, compiled, n_rows=2000) <= TOLERANCE
+
+
+@pytest.mark.parametrize("name", ["tree_model", "hgb_model"])
+def test_saved_artifact_parity(name, request, tmp_path):
+    model = request.getfixturevalue(name)
+    path = str(tmp_path / "model.npz")
+    compile_pipeline(model).save(path)
+    assert check_parity(model, load_compiled(path), n_rows=2000) <= TOLERANCE
+
+
+@pytest.mark.parametrize("name", ["tree_model", "hgb_model"])
+def test_missing_values_match_the_pipeline(name, request, tmp_path):
+    # NaN is imputed by the pipeline, which is not the same as an unknown category
+    model = request.getfixturevalue(name)
+    path = str(tmp_path / "model.npz")
+    compile_pipeline(model).save(path)
+    compiled = load_compiled(path)
+    base = {"AGENCY_NAME": "AGENCY 3", "CLASS_TITLE": "TITLE 7", "ETHNICITY": "WHITE",
+            "GENDER": "MALE", "STATUS": "CRF - CLASSIFIED REGULAR FULL-TIME"}
+    records = [dict(base, **{f: value}) for f in FEATURE_COLUMNS for value in (np.nan, "NOT A CATEGORY")]
+    expected = np.array([model.predict(pd.DataFrame([r], columns=FEATURE_COLUMNS))[0] for r in records])
+    assert np.allclose(compiled.predict_records(records), expected)
+    assert np.allclose([compiled.predict_one(r) for r in records], expected)
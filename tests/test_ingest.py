@@ -0,0 +1,30 @@
+# tests/test_ingest.py
+import pandas as pd
+
+import ingest
+
+
+def test_load_keeps_columns_memory_mapped(tmp_path):
+    csv_path = tmp_path / "salary.csv"
+    pd.DataFrame({
+        "AGENCY NAME": ["Agency A", "Agency B", None],
+        "CLASS TITLE": ["Clerk", "Analyst", "Clerk"],
+        "ETHNICITY": ["White", "Hispanic", "Black"],
+        "GENDER": ["Female", "Male", "Male"],
+        "STATUS": ["CRF", "URP", "CRF"],
+        "ANNUAL": [50000.0, 60000.0, None],
+        "MONTHLY": [4166, 5000, 3750],
+        "HRLY RATE": [0, 0, 0],
+        "HRS PER WK": [40, 40, 20],
+    }).to_csv(csv_path, index=False)
+    cache_dir = str(tmp_path / "salary_cache")
+    ingest.build(str(csv_path), cache_dir)
+    assert ingest.is_fresh(str(csv_path), cache_dir)
+
+    frame = ingest.load(cache_dir)
+    for name in frame.columns:
+        column = frame[name]
+        array = column.array.codes if isinstance(column.dtype, pd.CategoricalDtype) else column.to_numpy()
+        assert ingest.is_memory_mapped(array), name
+    assert frame["AGENCY_NAME"].isna().tolist() == [False, False, True]
+    assert frame["GENDER"].tolist() == ["FEMALE", "MALE", "MALE"]
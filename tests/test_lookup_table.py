@@ -0,0 +1,40 @@
+# tests/test_lookup_table.py
+import json
+
+import numpy as np
+import pandas as pd
+
+import ingest
+from lookup_table import build_table, read_salary_csv
+
+
+class ConstantModel:
+    def predict(self, frame):
+        return np.zeros(len(frame))
+
+
+def test_cache_and_csv_build_the_same_table(tmp_path):
+    csv_path = tmp_path / "salary.csv"
+    pd.DataFrame({
+        "AGENCY NAME": ["Agency A", "Agency A", "Agency B", None, "Agency B"],
+        "CLASS TITLE": ["Clerk", "Analyst", "Clerk", "Clerk", "Analyst"],
+        "ETHNICITY": ["White", None, "Hispanic", "Black", "Asian"],
+        "GENDER": ["Female", "Male", None, "Male", "Female"],
+        "STATUS": ["CRF", "CRF", "URP", "CRF", "CRF"],
+        "ANNUAL": [50000, 60000, 45000, 70000, 65000],
+        "MONTHLY": [4166, 5000, 3750, 5833, 5416],
+        "HRLY RATE": [0, 0, 0, 0, 0],
+        "HRS PER WK": [40, 40, 20, 40, 40],
+    }).to_csv(csv_path, index=False)
+    cache_dir = tmp_path / "salary_cache"
+    ingest.build(str(csv_path), str(cache_dir))
+
+    tables = {}
+    for label, path in [("csv", csv_path), ("cache", cache_dir)]:
+        name = str(tmp_path / label)
+        build_table(read_salary_csv(str(path)), ConstantModel(), name)
+        with open(f"{name}.json", encoding="utf-8") as f:
+            tables[label] = json.load(f)
+    assert tables["cache"] == tables["csv"]
+    assert "nan" not in tables["cache"]["small_vocabularies"]["ETHNICITY"]
+    assert len(tables["cache"]["pairs"]) == 2
@@ -0,0 +1,31 @@
+# tests/test_prediction_cache.py
+import numpy as np
+
+from prediction_cache import PredictionCache
+
+
+def test_byte_budget_evicts_oldest():
+    cache = PredictionCache(maxsize=10, ttl=None, max_bytes=800, sizeof=lambda v: v.nbytes)
+    for key in range(3):
+        cache.put(key, np.zeros(40))  # 320 bytes each
+    assert cache.get(0) is None
+    assert cache.get(1) is not None and cache.get(2) is not None
+    assert cache.stats()["bytes"] == 640
+
+
+def test_value_over_budget_is_not_cached():
+    cache = PredictionCache(maxsize=10, ttl=None, max_bytes=800, sizeof=lambda v: v.nbytes)
+    cache.put("small", np.zeros(10))
+    cache.put("huge", np.zeros(1000))
+    assert cache.get("huge") is None
+    assert cache.get("small") is not None
+    assert cache.stats()["rejected"] == 1
+
+
+def test_replacing_a_key_keeps_the_byte_count():
+    cache = PredictionCache(maxsize=10, ttl=None, max_bytes=800, sizeof=lambda v: v.nbytes)
+    cache.put("a", np.zeros(40))
+    cache.put("a", np.zeros(20))
+    assert cache.stats()["bytes"] == 160
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
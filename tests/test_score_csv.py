@@ -0,0 +1,35 @@
+# tests/test_score_csv.py
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled_model import FEATURE_COLUMNS
+from lookup_table import RAW_COLUMNS
+from score_csv import score_file
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_blank_fields_are_imputed_not_unknown(compiled, tree_model, tmp_path):
+    model_path = str(tmp_path / "model.pkl")
+    joblib.dump(tree_model, model_path)
+    rows = [
+        {"AGENCY_NAME": "agency 3", "CLASS_TITLE": "title 7", "ETHNICITY": "white",
+         "GENDER": "male", "STATUS": "CRF - CLASSIFIED REGULAR FULL-TIME"},
+        {"AGENCY_NAME": "AGENCY 3", "CLASS_TITLE": "", "ETHNICITY": "WHITE",
+         "GENDER": "MALE", "STATUS": "CRF - CLASSIFIED REGULAR FULL-TIME"},
+    ]
+    raw_headers = {field: raw for raw, field in RAW_COLUMNS.items()}
+    input_path, output_path = str(tmp_path / "in.csv"), str(tmp_path / "out.csv")
+    pd.DataFrame(rows).rename(columns=raw_headers).to_csv(input_path, index=False)
+
+    score_file(input_path, output_path, model_path=model_path, compiled=compiled)
+    scored = pd.read_csv(output_path)["PREDICTED_ANNUAL"].to_numpy()
+
+    expected = tree_model.predict(pd.DataFrame([
+        {f: value.upper() for f, value in rows[0].items()},
+        dict(rows[1], CLASS_TITLE=np.nan),
+    ], columns=FEATURE_COLUMNS))
+    as_unknown = tree_model.predict(pd.DataFrame([dict(rows[1], CLASS_TITLE="NAN")], columns=FEATURE_COLUMNS))
+    assert np.allclose(scored, expected)
+    assert not np.isclose(scored[1], as_unknown[0])
@@ -0,0 +1,251 @@
+# train.py
+"""Rebuild model_simple.pkl from salary.csv.
+
+    python train.py salary.csv model_simple.pkl
+    python train.py salary.csv model_simple.pkl --no-search --export model_simple.npz
+    python train.py snapshot.csv model_simple.pkl --incremental train_state.npz
+    python train.py salary.csv model_hgb.pkl --model hgb --export model_hgb.npz
+
+Pipeline (same as the notebook):
+
+    ColumnNameCleaner
+    -> ColumnTransformer
+         ETHNICITY / GENDER / STATUS: SimpleImputer -> OrdinalEncoder -> MinMaxScaler
+         AGENCY_NAME / CLASS_TITLE:   SimpleImputer -> CountEncoder(normalize) -> MinMaxScaler
+    -> TransformedTargetRegressor(log1p / expm1, DecisionTreeRegressor)
+
+--model hgb swaps in a boosted ensemble that handles the categories natively:
+
+    ColumnNameCleaner
+    -> CategoryCodes (frequency-ranked integer codes, at most 255 per column)
+    -> TransformedTargetRegressor(log1p / expm1, HistGradientBoostingRegressor)
+
+The preprocessing is cached on disk through the Pipeline's `memory=`, so every
+hyperparameter candidate (and every re-run on the same data) reuses the fitted
+transforms instead of refitting them. The grid search runs on all cores.
+
+--incremental adds the data to running statistics kept in a state file and
+refits from those (default parameters, no search), so a new payroll snapshot
+costs time proportional to its own size; see incremental.py.
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from category_encoders import CountEncoder
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, KFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, OrdinalEncoder
+from sklearn.tree import DecisionTreeRegressor
+
+import ingest
+from custom_transformers import CategoryCodes, ColumnNameCleaner
+from lookup_table import RAW_COLUMNS
+
+CATEGORICAL_COLUMNS = ["ETHNICITY", "GENDER", "STATUS"]
+FREQUENCY_COLUMNS = ["AGENCY_NAME", "CLASS_TITLE"]
+
+MODELS = ("tree", "hgb")
+
+DEFAULT_PARAMS = {"max_depth": 20, "min_samples_leaf": 5}
+PARAM_GRID = {
+    "model__regressor__max_depth": [10, 15, 20, 25, None],
+    "model__regressor__min_samples_leaf": [1, 2, 5, 10, 20],
+}
+
+# Early stopping holds out 10% of the training rows and usually stops well before max_iter
+HGB_DEFAULT_PARAMS = {"learning_rate": 0.1, "max_iter": 300, "max_leaf_nodes": 31, "min_samples_leaf": 20}
+HGB_PARAM_GRID = {
+    "model__regressor__learning_rate": [0.05, 0.1, 0.2],
+    "model__regressor__max_leaf_nodes": [15, 31, 63],
+    "model__regressor__l2_regularization": [0.0, 1.0],
+}
+
+
+def _categorical_pipeline():
+    return Pipeline([
+        ("imputer", SimpleImputer(strategy="most_frequent")),
+        ("encoder", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1)),
+        ("scaler", MinMaxScaler()),
+    ])
+
+
+def build_pipeline(params=None, memory=None, random_state=42, model="tree"):
+    if model == "hgb":
+        return _hgb_pipeline(params, memory, random_state)
+    if model != "tree":
+        raise ValueError(f"Unknown model: {model} (expected one of {', '.join(MODELS)})")
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    preprocessor = ColumnTransformer([
+        ("ethnicity", _categorical_pipeline(), ["ETHNICITY"]),
+        ("gender", _categorical_pipeline(), ["GENDER"]),
+        ("status", _categorical_pipeline(), ["STATUS"]),
+        ("frequency", Pipeline([
+            ("imputer", SimpleImputer(strategy="most_frequent")),
+            ("encoder", CountEncoder(normalize=True)),
+            ("scaler", MinMaxScaler()),
+        ]), FREQUENCY_COLUMNS),
+    ])
+    regressor = TransformedTargetRegressor(
+        regressor=DecisionTreeRegressor(random_state=random_state, **params),
+        func=np.log1p,
+        inverse_func=np.expm1,
+    )
+    return Pipeline([
+        ("cleaner", ColumnNameCleaner()),
+        ("preprocessor", preprocessor),
+        ("model", regressor),
+    ], memory=memory)
+
+
+def _hgb_pipeline(params=None, memory=None, random_state=42):
+    params = {**HGB_DEFAULT_PARAMS, **(params or {})}
+    regressor = TransformedTargetRegressor(
+        regressor=HistGradientBoostingRegressor(
+            categorical_features=list(range(len(RAW_COLUMNS))), random_state=random_state, **params
+        ),
+        func=np.log1p,
+        inverse_func=np.expm1,
+    )
+    return Pipeline([
+        ("cleaner", ColumnNameCleaner()),
+        ("preprocessor", CategoryCodes()),
+        ("model", regressor),
+    ], memory=memory)
+
+
+def load_training_data(path, target="ANNUAL"):
+    if os.path.isdir(path):
+        # Columnar cache from ingest.py: already upper-cased and categorical
+        data = ingest.load(path, columns=list(RAW_COLUMNS.values()) + [target])
+        data = data[data[target].notna()]
+        return data[list(RAW_COLUMNS.values())], data[target].to_numpy(dtype=np.float64)
+
+    data = pd.read_csv(path, usecols=list(RAW_COLUMNS) + [target])
+    data = data.dropna(subset=[target])
+    X = data[list(RAW_COLUMNS)]
+    # Same upper-casing as SalaryInput
+    X = X.apply(lambda column: column.str.upper())
+    # Categorical columns hash as integer codes, which keeps the joblib cache
+    # lookups cheap (object columns get pickled string by string)
+    X = X.astype("category")
+    return X, data[target].to_numpy(dtype=np.float64)
+
+
+def evaluate(model, X, y):
+    predictions = model.predict(X)
+    return {
+        "r2": r2_score(y, predictions),
+        "mae": mean_absolute_error(y, predictions),
+        "rmse": float(np.sqrt(mean_squared_error(y, predictions))),
+    }
+
+
+def split(X, y, random_state=42):
+    """The 80/20 train/test split; export_model.py reuses it to stay off the test rows."""
+    return train_test_split(X, y, test_size=0.2, random_state=random_state)
+
+
+def train(X, y, search=True, cache_dir=".train_cache", n_jobs=-1, cv=5, random_state=42, verbose=0, model="tree"):
+    """Returns (model, best_params, test metrics, (X_train, y_train))."""
+    X_train, X_test, y_train, y_test = split(X, y, random_state)
+    pipeline = build_pipeline(memory=cache_dir, random_state=random_state, model=model)
+
+    if search:
+        param_grid = HGB_PARAM_GRID if model == "hgb" else PARAM_GRID
+        grid = GridSearchCV(pipeline, param_grid, scoring="r2", n_jobs=n_jobs, verbose=verbose,
+                            cv=KFold(n_splits=cv, shuffle=True, random_state=random_state))
+        grid.fit(X_train, y_train)
+        model, best_params = grid.best_estimator_, grid.best_params_
+    else:
+        model, best_params = pipeline.fit(X_train, y_train), {}
+
+    # Don't ship a pickle that points at the local cache directory
+    model.set_params(memory=None)
+    return model, best_params, evaluate(model, X_test, y_test), (X_train, y_train)
+
+
+def train_incremental(data_path, output, state_path, target="ANNUAL", export_path=None):
+    from incremental import TrainingStats, snapshot_checksum
+
+    started = time.perf_counter()
+    stats = TrainingStats.load(state_path) if os.path.exists(state_path) else TrainingStats()
+    X, y = load_training_data(data_path, target)
+    try:
+        added = stats.update(X, y, source=snapshot_checksum(data_path))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"Added {added:,} rows in {time.perf_counter() - started:.1f}s: "
+          f"{stats.rows:,} rows in {len(stats):,} category combinations")
+
+    started = time.perf_counter()
+    model = stats.fit()
+    print(f"Refit from the statistics in {time.perf_counter() - started:.1f}s")
+    joblib.dump(model, output)
+    print(f"Wrote {output}")
+    # Only once the model is written, so a failed run can be retried with the same snapshot
+    stats.save(state_path)
+    print(f"Wrote {state_path}")
+
+    if export_path:
+        from export_model import export
+        export(output, export_path)
+        print(f"Wrote {export_path} (no leaf intervals in incremental mode)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the salary model")
+    parser.add_argument("data", nargs="?", default="salary.csv", help="salary.csv or an ingest.py cache directory")
+    parser.add_argument("output", nargs="?", default="model_simple.pkl")
+    parser.add_argument("--target", default="ANNUAL")
+    parser.add_argument("--model", choices=MODELS, default="tree",
+                        help="decision tree (default) or histogram gradient boosting")
+    parser.add_argument("--no-search", action="store_true", help="fit the default parameters only")
+    parser.add_argument("--cache-dir", default=".train_cache", help="preprocessing cache ('' disables)")
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--export", help="also write the slim .npz serving artifact (tree: with leaf intervals)")
+    parser.add_argument("--incremental", metavar="STATE",
+                        help="add the data to the training statistics in STATE and refit from them")
+    args = parser.parse_args(argv)
+
+    if args.incremental:
+        if args.model != "tree":
+            print("❌ --incremental only supports the decision tree")
+            return 1
+        return train_incremental(args.data, args.output, args.incremental, args.target, args.export)
+
+    started = time.perf_counter()
+    X, y = load_training_data(args.data, args.target)
+    print(f"Loaded {len(X):,} rows in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    model, best_params, metrics, training_rows = train(X, y, search=not args.no_search, cache_dir=args.cache_dir or None,
+                                        n_jobs=args.jobs, cv=args.cv, model=args.model)
+    defaults = HGB_DEFAULT_PARAMS if args.model == "hgb" else DEFAULT_PARAMS
+    print(f"Trained in {time.perf_counter() - started:.1f}s, best params: {best_params or defaults}")
+    print(f"Test R² = {metrics['r2']:.3f}, MAE = ${metrics['mae']:,.2f}, RMSE = ${metrics['rmse']:,.2f}")
+
+    joblib.dump(model, args.output)
+    print(f"Wrote {args.output}")
+
+    if args.export:
+        from export_model import export
+        # Leaf intervals from the training rows only, or they'd look tighter than they are
+        export(args.output, args.export, data=training_rows)
+        print(f"Wrote {args.export}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+# wire_formats.py
+"""Request and response encodings for the prediction endpoints.
+
+    json     application/json                     default, encoded with orjson when installed
+    msgpack  application/msgpack                  same shape as the JSON, binary (pip install msgpack)
+    arrow    application/vnd.apache.arrow.stream  one record batch, a column per field (pip install pyarrow)
+    ndjson   application/x-ndjson                 one JSON object per line, streamed
+
+Clients choose the request format with Content-Type and the response format
+with Accept. Arrow and NDJSON carry the row-aligned part of a response as rows;
+the rest (model version, errors, ...) goes into the Arrow schema metadata under
+"salary" or onto the first NDJSON line.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output shape
+    orjson = None
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "ndjson": "application/x-ndjson",
+}
+# Other spellings seen in the wild
+_FORMATS = {media_type: fmt for fmt, media_type in MEDIA_TYPES.items()}
+_FORMATS.update({
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    "application/jsonl": "ndjson",
+    "application/json-seq": "ndjson",
+})
+# Rows per chunk of a streamed NDJSON response
+NDJSON_CHUNK_ROWS = 2000
+
+
+def available():
+    """Formats whose libraries are installed.
+
+    Only looks the packages up: msgpack and pyarrow are imported on first use,
+    so they don't add to every worker's startup time and memory.
+    """
+    from importlib.util import find_spec
+
+    formats = {"json", "ndjson"}
+    if find_spec("msgpack") is not None:
+        formats.add("msgpack")
+    if find_spec("pyarrow") is not None:
+        formats.add("arrow")
+    return formats
+
+
+AVAILABLE = available()
+
+
+def _media_type(value):
+    return value.split(";", 1)[0].strip().lower()
+
+
+def content_format(content_type):
+    """Format of a request body from its Content-Type; JSON when there is none."""
+    if not content_type:
+        return "json"
+    media_type = _media_type(content_type)
+    if media_type.endswith("+json"):
+        return "json"
+    return _FORMATS.get(media_type)
+
+
+def negotiate(accept, offered):
+    """Best format in offered for an Accept header, or None if none is acceptable.
+
+    Honours q-values; ties go to the order of offered, so JSON stays the
+    default for "*/*" and for a missing header.
+    """
+    if not accept:
+        return offered[0]
+    best, best_q = None, 0.0
+    for part in accept.split(","):
+        media_type, *params = part.split(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in ("*/*", "application/*"):
+            candidates = offered
+        else:
+            fmt = _FORMATS.get(media_type)
+            candidates = [fmt] if fmt in offered else []
+        for fmt in candidates:
+            if q > best_q or (q == best_q and best is not None and offered.index(fmt) < offered.index(best)):
+                best, best_q = fmt, q
+    return best
+
+
+def dumps_json(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode(body, fmt):
+    """Request body -> Python objects.
+
+    json/msgpack give whatever the client sent, ndjson a list of objects and
+    arrow a dict of column lists.
+    """
+    if fmt == "json":
+        return loads_json(body)
+    if fmt == "msgpack":
+        import msgpack
+        return msgpack.unpackb(body)
+    if fmt == "ndjson":
+        return [loads_json(line) for line in body.splitlines() if line.strip()]
+    if fmt == "arrow":
+        import pyarrow as pa
+        table = pa.ipc.open_stream(body).read_all()
+        return {name: _arrow_column(column.combine_chunks())
+                for name, column in zip(table.column_names, table.columns)}
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _arrow_column(column):
+    import pyarrow as pa
+    if pa.types.is_dictionary(column.type) and column.null_count == 0:
+        # Build each distinct value once instead of a Python object per row
+        categories = column.dictionary.to_pylist()
+        return list(map(categories.__getitem__, column.indices.to_pylist()))
+    return column.to_pylist()
+
+
+def encode(fmt, content, table=None, table_keys=()):
+    """Encode a response; returns bytes, or an iterator of bytes for ndjson.
+
+    content is the full JSON-shaped response. For arrow and ndjson, table
+    (column name -> row-aligned values) is sent as rows and the keys of
+    content listed in table_keys are left out of the metadata.
+    """
+    if fmt == "json":
+        return dumps_json(content)
+    if fmt == "msgpack":
+        import msgpack
+        return msgpack.packb(content)
+    meta = {key: value for key, value in content.items() if key not in table_keys}
+    table = table or {}
+    if fmt == "arrow":
+        import pyarrow as pa
+        batch = pa.RecordBatch.from_pydict(table, metadata={"salary": dumps_json(meta)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
+    if fmt == "ndjson":
+        return _ndjson_lines(meta, table)
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _ndjson_lines(meta, table):
+    yield dumps_json(meta) + b"\n"
+    names = list(table)
+    rows = len(table[names[0]]) if names else 0
+    for start in range(0, rows, NDJSON_CHUNK_ROWS):
+        chunk = zip(*[table[name][start:start + NDJSON_CHUNK_ROWS] for name in names])
+        yield b"".join(dumps_json(dict(zip(names, row))) + b"\n" for row in chunk)